@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from types import CodeType
+from typing import TypeVar
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import DisallowedHost
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http import QueryDict
+from django.urls import get_urlconf
+from django.urls import set_urlconf
+from django.utils import translation
+from django.utils.functional import LazyObject
+from django.utils.functional import Promise
+from django.utils.functional import empty
+from django.utils.module_loading import import_string
+
+from django_simple_nav.conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# how long a background refresh may take before another worker is allowed to
+# try, in case the process running it dies without releasing the lock
+REFRESH_LOCK_TIMEOUT = 30
+
+# how long to wait for HTML missing from the cache that another worker is
+# already rendering, and how often to check for it
+MISS_WAIT_TIMEOUT = 2.0
+MISS_WAIT_INTERVAL = 0.05
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_cache() -> BaseCache:
+    """Return the cache configured by `DJANGO_SIMPLE_NAV["CACHE"]` for nav HTML."""
+    return caches[str(app_settings.CACHE)]
+
+
+def make_cache_key(name: str, *vary_on: object) -> str:
+    """Build a cache key for a cached piece of nav HTML called `name`.
+
+    Keys are built the same way as the ones for Django's `{% cache %}` tag, so
+    any value can be used to vary on and the key is always safe to use with
+    memcached.
+    """
+    return make_template_fragment_key(f"django_simple_nav.{name}", vary_on)
+
+
+def fingerprint(value: object) -> object:
+    """Reduce `value` to plain data that is the same in every process.
+
+    Nav items are reduced to their content hash, and classes to their import
+    path, since their `repr()` includes a memory address. Functions are reduced
+    to their import path and their compiled code, so changing the body of a
+    lambda changes its fingerprint, though not what it reads from a closure or
+    global. Any other objects whose `repr()` includes a memory address are
+    reduced to their type.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if (get_content_hash := getattr(value, "get_content_hash", None)) is not None:
+        return get_content_hash()
+    if isinstance(value, Promise):
+        # e.g. `reverse_lazy()`, fingerprinted by what it was called with
+        # rather than what it evaluates to, which may not be ready yet
+        return (
+            "lazy",
+            fingerprint(getattr(value, "_args", ())),
+            fingerprint(getattr(value, "_kw", {})),
+        )
+    if isinstance(value, Mapping):
+        return tuple(
+            sorted((str(key), fingerprint(item)) for key, item in value.items())
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(fingerprint(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(fingerprint(item)) for item in value))
+    if callable(value):
+        qualname = getattr(value, "__qualname__", type(value).__qualname__)
+        path = f"{getattr(value, '__module__', '')}.{qualname}"
+        if isinstance(code := getattr(value, "__code__", None), CodeType):
+            return (path, _fingerprint_code(code))
+        return path
+    if " at 0x" in (rendered := repr(value)):
+        return f"{type(value).__module__}.{type(value).__qualname__}"
+    return rendered
+
+
+def _fingerprint_code(code: CodeType) -> object:
+    # the bytecode, with the constants and names it refers to, but not the line
+    # numbers, so moving a function around a file doesn't change it
+    return (
+        code.co_code,
+        tuple(
+            _fingerprint_code(const)
+            if isinstance(const, CodeType)
+            else fingerprint(const)
+            for const in code.co_consts
+        ),
+        code.co_names,
+    )
+
+
+def make_digest(*values: object) -> str:
+    """Return a digest of the `fingerprint()` of `values`."""
+    data = repr(fingerprint(values)).encode()
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+
+# the content hash of each `Nav` class named by a dotted path, by the class
+_class_content_hashes: weakref.WeakKeyDictionary[type, str] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_class_content_hash(cls: type) -> str:
+    """Return the content hash of a default instance of `cls`, computed once.
+
+    Not kept for navs that declare their items somewhere other than the class,
+    e.g. a `ModelNav`, whose items come from the database.
+    """
+    try:
+        return _class_content_hashes[cls]
+    except KeyError:
+        pass
+
+    from .nav import Nav
+
+    content_hash: str = cls().get_content_hash()
+    if getattr(cls, "_get_declared_items", None) is Nav._get_declared_items:
+        _class_content_hashes[cls] = content_hash
+    return content_hash
+
+
+def get_nav_identity(nav: object) -> str:
+    """Return a name for `nav`, as passed to the template tag, to build keys with.
+
+    A dotted path is its own name, and a `Nav` or factory is named after its
+    class or function. A `Nav`, or a dotted path to a `Nav` class or instance,
+    is also named after its content hash, so changing its items changes the
+    name. A factory can't be without calling it, so its name doesn't change.
+    """
+    if isinstance(nav, str):
+        try:
+            imported = import_string(nav)
+        except ImportError:
+            # reported when the nav is resolved to render it
+            return nav
+        if not hasattr(imported, "get_content_hash"):
+            return nav
+        if isinstance(imported, type):
+            return f"{nav}:{_get_class_content_hash(imported)}"
+        return f"{nav}:{imported.get_content_hash()}"
+    if callable(nav):
+        return f"{nav.__module__}.{getattr(nav, '__qualname__', repr(nav))}"
+
+    cls = type(nav)
+    identity = f"{cls.__module__}.{cls.__qualname__}"
+    if (get_content_hash := getattr(nav, "get_content_hash", None)) is not None:
+        identity = f"{identity}:{get_content_hash()}"
+    return identity
+
+
+def make_render_cache_key(
+    nav: object,
+    template_name: str | None,
+    request: HttpRequest,
+    vary_on: Sequence[object] = (),
+    max_depth: int | None = None,
+) -> str:
+    """Build the key to cache a nav rendered by the template tag or Jinja2 global.
+
+    Besides `nav`, `template_name` and `max_depth`, it varies on the user, the
+    scheme and host, the path, the query string, the active language and the
+    urlconf, plus anything in `vary_on`. The query string, scheme and host are
+    included since the `"exact"` matching of items compares them, and the key is
+    built before the nav, and so its items, are known.
+    """
+    user = getattr(request, "user", None)
+    try:
+        host = request.get_host()
+    except DisallowedHost:
+        # left to raise if an item actually compares it
+        host = None
+    return make_cache_key(
+        "render",
+        get_nav_identity(nav),
+        template_name,
+        max_depth,
+        getattr(user, "pk", None),
+        request.scheme,
+        host,
+        request.path,
+        sorted(request.GET.lists()),
+        translation.get_language(),
+        get_urlconf(),
+        *vary_on,
+    )
+
+
+def get_refresh_executor() -> ThreadPoolExecutor:
+    """Return the process-wide worker used to refresh stale HTML in the background."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="django_simple_nav"
+            )
+        return _executor
+
+
+def snapshot_request(request: HttpRequest) -> HttpRequest:
+    """Return a new request with the parts of `request` a nav render may read.
+
+    Used to render in the background after `request`'s response has been sent,
+    when its session, lazily loaded user and database connection belong to a
+    request cycle that has already ended. The user and session are loaded now,
+    while they still can be, and copied over as plain values.
+    """
+    snapshot = HttpRequest()
+    snapshot.method = request.method
+    snapshot.path = request.path
+    snapshot.path_info = request.path_info
+    snapshot.META = {
+        key: value
+        for key, value in request.META.items()
+        if isinstance(value, (str, int, float, bool, tuple))
+    }
+    snapshot.GET = QueryDict(request.GET.urlencode())
+    snapshot.COOKIES = dict(request.COOKIES)
+    snapshot.resolver_match = getattr(request, "resolver_match", None)
+    for name in ("urlconf", "LANGUAGE_CODE"):
+        if (value := getattr(request, name, None)) is not None:
+            setattr(snapshot, name, value)
+
+    if (user := getattr(request, "user", None)) is not None:
+        if isinstance(user, LazyObject):
+            # e.g. the `SimpleLazyObject` set by `AuthenticationMiddleware`
+            if user._wrapped is empty:
+                user._setup()
+            user = user._wrapped
+        snapshot.user = user
+    if (session := getattr(request, "session", None)) is not None:
+        snapshot.session = dict(session.items())  # type: ignore[assignment]
+    return snapshot
+
+
+def store(
+    key: str,
+    rendered: object,
+    timeout: float | None = DEFAULT_TIMEOUT,
+    stale_timeout: float | None = None,
+) -> None:
+    """Cache `rendered` under `key`, in the format read by `get_or_render()`."""
+    cache = get_cache()
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+
+    if timeout is None or not stale_timeout:
+        cache.set(key, (rendered, None), timeout)
+        return
+
+    # keep the entry around for `stale_timeout` after it goes stale, so there is
+    # always something to serve while it is refreshed
+    cache.set(key, (rendered, time.time() + timeout), timeout + stale_timeout)
+
+
+def _refresh(
+    key: str,
+    render: Callable[[HttpRequest], object],
+    request: HttpRequest,
+    timeout: float | None,
+    stale_timeout: float | None,
+    language: str | None,
+    urlconf: str | None,
+) -> None:
+    close_old_connections()
+    set_urlconf(urlconf)
+    try:
+        with translation.override(language):
+            store(key, render(request), timeout, stale_timeout)
+    except Exception:
+        logger.exception("Failed to refresh cached nav HTML in the background")
+    finally:
+        release_lock(key)
+        set_urlconf(None)
+        close_old_connections()
+
+
+def get_or_render(
+    key: str,
+    request: HttpRequest,
+    render: Callable[[HttpRequest], T],
+    timeout: float | None = DEFAULT_TIMEOUT,
+    stale_timeout: float | None = None,
+) -> T:
+    """Return the HTML cached under `key`, calling `render` to fill the cache.
+
+    Cached HTML is fresh for `timeout` seconds. With a `stale_timeout`, it is
+    then served stale for up to that many seconds longer while a background
+    worker calls `render` to refresh it, rather than making the request that
+    finds it stale wait. A lock in the cache makes sure only one worker renders
+    each key at a time, whether it's stale or missing altogether, so an expiring
+    or cold entry is never recomputed by every request that sees it at once.
+    """
+    if (cached := get_cached(key, request, render, timeout, stale_timeout)) is not None:
+        return cached
+    return render_missing(key, request, render, timeout, stale_timeout)
+
+
+def render_missing(
+    key: str,
+    request: HttpRequest,
+    render: Callable[[HttpRequest], T],
+    timeout: float | None = DEFAULT_TIMEOUT,
+    stale_timeout: float | None = None,
+) -> T:
+    """Render the HTML missing from the cache under `key`, and cache it.
+
+    If another worker is already rendering the same key, its HTML is waited for
+    rather than rendered again, as described in `wait_for()`, and only rendered
+    here, without being cached, if it doesn't arrive in time.
+    """
+    if not acquire_lock(key):
+        cache = get_cache()
+
+        def lookup() -> T | None:
+            entry: tuple[T, float | None] | None = cache.get(key)
+            return None if entry is None else entry[0]
+
+        if (rendered := wait_for(lookup)) is not None:
+            return rendered
+        return render(request)
+
+    try:
+        rendered = render(request)
+        store(key, rendered, timeout, stale_timeout)
+    finally:
+        release_lock(key)
+    return rendered
+
+
+def acquire_lock(key: str) -> bool:
+    """Take the lock on rendering the HTML cached under `key`, if it's free."""
+    return bool(get_cache().add(f"{key}.lock", True, REFRESH_LOCK_TIMEOUT))
+
+
+def release_lock(key: str) -> None:
+    get_cache().delete(f"{key}.lock")
+
+
+def wait_for(lookup: Callable[[], T | None]) -> T | None:
+    """Call `lookup` until it returns something, for up to `MISS_WAIT_TIMEOUT` seconds.
+
+    Used while another worker holds the lock on rendering some HTML, so a cold
+    cache isn't filled by every request that finds it empty at once.
+    """
+    deadline = time.monotonic() + MISS_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(MISS_WAIT_INTERVAL)
+        if (found := lookup()) is not None:
+            return found
+    return None
+
+
+def get_cached(
+    key: str,
+    request: HttpRequest,
+    render: Callable[[HttpRequest], T],
+    timeout: float | None = DEFAULT_TIMEOUT,
+    stale_timeout: float | None = None,
+) -> T | None:
+    """Return the HTML cached under `key`, or `None` if there isn't any.
+
+    Stale HTML is returned as is, after queueing a call to `render` to refresh
+    it, as described in `get_or_render()`.
+    """
+    cache = get_cache()
+    entry: tuple[T, float | None] | None = cache.get(key)
+    if entry is None:
+        return None
+
+    rendered, fresh_until = entry
+    if fresh_until is not None and fresh_until <= time.time() and acquire_lock(key):
+        submit_refresh(key, request, render, timeout, stale_timeout)
+    return rendered
+
+
+def submit_refresh(
+    key: str,
+    request: HttpRequest,
+    render: Callable[[HttpRequest], object],
+    timeout: float | None,
+    stale_timeout: float | None,
+) -> Future[None]:
+    """Refresh the HTML cached under `key` on the background worker.
+
+    `render` is called with a `snapshot_request()` of `request`, since the
+    worker may only get to it after the request is over. The active language
+    and URLconf are thread-local, so they are carried over to the worker to
+    render the same HTML the current thread would have.
+    """
+    return get_refresh_executor().submit(
+        _refresh,
+        key,
+        render,
+        snapshot_request(request),
+        timeout,
+        stale_timeout,
+        translation.get_language(),
+        get_urlconf(),
+    )
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from django.utils.safestring import SafeString
+from django.utils.safestring import mark_safe
+
+if TYPE_CHECKING:
+    from .nav import NavItem
+
+_client_active: ContextVar[bool] = ContextVar(
+    "django_simple_nav_client_active", default=False
+)
+
+# marks each element with a `data-nav-path` that matches the current page, and
+# the links of the groups containing it, the same way the bundled templates do
+# on the server
+ACTIVE_SCRIPT: SafeString = mark_safe(
+    """<script>(function () {
+  var here = new URL(location.href);
+  function trim(path) { return path.replace(/\\/+$/, ""); }
+  document.querySelectorAll("[data-nav-path]").forEach(function (el) {
+    var path = el.getAttribute("data-nav-path");
+    var match = el.getAttribute("data-nav-match");
+    var active;
+    if (match === "regex") {
+      active = new RegExp("^(?:" + path + ")").test(here.pathname);
+    } else if (match === "prefix") {
+      var prefix = trim(new URL(path, here).pathname);
+      active = trim(here.pathname) === prefix || here.pathname.indexOf(prefix + "/") === 0;
+    } else {
+      var url = new URL(path, here);
+      active = url.origin === here.origin && url.pathname === here.pathname && url.search === here.search;
+    }
+    if (!active) return;
+    el.setAttribute("aria-current", "page");
+    for (var list = el.closest("ul"); list; list = list.parentElement && list.parentElement.closest("ul")) {
+      var group = list.previousElementSibling;
+      if (group && group.hasAttribute("data-nav-path")) group.setAttribute("aria-current", "page");
+    }
+  });
+})();</script>"""
+)
+
+
+@contextmanager
+def client_active() -> Iterator[None]:
+    """Leave the active state of the items built within to the browser."""
+    token = _client_active.set(True)
+    try:
+        yield
+    finally:
+        _client_active.reset(token)
+
+
+def is_client_active() -> bool:
+    """Check if the items being built leave their active state to the browser."""
+    return _client_active.get()
+
+
+def get_client_context(item: NavItem, url: str) -> dict[str, object]:
+    """Return the context that lets the browser work out `item`'s active state.
+
+    `nav_path` is what the item matches against and `nav_match` how, for the
+    strategies that differ from comparing the whole URL. A `view_name` can't be
+    resolved in the browser, so it's matched by the path of the item's URL.
+    """
+    if item.match == "prefix":
+        return {"nav_path": item._get_prefix(), "nav_match": "prefix"}
+    if item.match == "regex":
+        return {"nav_path": item.pattern, "nav_match": "regex"}
+    if item.match == "view_name":
+        return {"nav_path": urlparse(url).path, "nav_match": ""}
+    return {"nav_path": url, "nav_match": ""}
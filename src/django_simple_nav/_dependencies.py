@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from collections.abc import Mapping
+
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+from ._plan import NavPlan
+
+# a dependency on something about the request that can't be captured in a key,
+# e.g. a custom attribute set by a middleware, or data written to the request
+UNCACHEABLE = "*"
+
+# the dependencies recorded when an attribute of the request is read
+_ATTRIBUTE_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "user": ("user",),
+    "path": ("path",),
+    "path_info": ("path",),
+    "resolver_match": ("path",),
+    "get_full_path": ("path", "query"),
+    "get_full_path_info": ("path", "query"),
+    "GET": ("query",),
+    "scheme": ("host",),
+    "is_secure": ("host",),
+    "get_host": ("host",),
+    "get_port": ("host",),
+    "build_absolute_uri": ("host", "path", "query"),
+    "method": ("method",),
+    # always part of the key, since reversing URLs depends on them
+    "LANGUAGE_CODE": (),
+    "urlconf": (),
+    # read by `{% url %}` to resolve namespaced URLs, and only set by views
+    "current_app": (),
+}
+
+# the attributes that are mappings tracked key by key, and the prefix of the
+# dependencies recorded for them
+_MAPPING_DEPENDENCIES: dict[str, str] = {
+    "COOKIES": "cookie",
+    "META": "meta",
+    "session": "session",
+}
+
+# per-request state from working out which items a user can see, which is
+# captured by the `permissions` dependency rather than whatever was read to
+# work it out
+_PERMISSION_STATE = (
+    "_django_simple_nav_permissions",
+    "_django_simple_nav_hidden",
+    "_django_simple_nav_plans",
+)
+
+
+class TrackedMapping:
+    """Stands in for a mapping on the request, recording each key read from it."""
+
+    __slots__ = ("_mapping", "_prefix", "_tracked")
+
+    _mapping: Mapping[str, object]
+    _prefix: str
+    _tracked: TrackedRequest
+
+    def __init__(
+        self, mapping: Mapping[str, object], prefix: str, tracked: TrackedRequest
+    ) -> None:
+        self._mapping = mapping
+        self._prefix = prefix
+        self._tracked = tracked
+
+    def __getitem__(self, key: str) -> object:
+        self._tracked.dependencies.add(f"{self._prefix}:{key}")
+        return self._mapping[key]
+
+    def __contains__(self, key: str) -> bool:
+        self._tracked.dependencies.add(f"{self._prefix}:{key}")
+        return key in self._mapping
+
+    def get(self, key: str, default: object = None) -> object:
+        self._tracked.dependencies.add(f"{self._prefix}:{key}")
+        return self._mapping.get(key, default)
+
+    def __setitem__(self, key: str, value: object) -> None:
+        # e.g. `get_token()` flagging the CSRF cookie for an update in `META`
+        self._tracked.dependencies.add(UNCACHEABLE)
+        self._mapping[key] = value  # type: ignore[index]
+
+    def __delitem__(self, key: str) -> None:
+        self._tracked.dependencies.add(UNCACHEABLE)
+        del self._mapping[key]  # type: ignore[attr-defined]
+
+    def __getattr__(self, name: str) -> object:
+        # anything else, e.g. iterating over every key or updating it
+        self._tracked.dependencies.add(UNCACHEABLE)
+        return getattr(self._mapping, name)
+
+
+class TrackedRequest:
+    """Stands in for a request, recording which parts of it are read.
+
+    Each part is recorded as a dependency, a name for which `get_value()` can get
+    its value from any other request. Per-request state that the nav caches on
+    the request is kept on this object, so it's worked out again from the parts
+    of the request it depends on, except for the visibility of `plan`'s items,
+    which is recorded as the single `permissions` dependency.
+
+    Private attributes, such as the `_messages` read by the `messages` context
+    processor, are framework state rather than input to the nav, and reading the
+    user only records a dependency once it's used, so the context processors run
+    for every template don't make a render depend on the user by themselves.
+    """
+
+    __slots__ = ("_local", "_request", "dependencies")
+
+    _local: dict[str, object]
+    _request: HttpRequest
+    dependencies: set[str]
+
+    def __init__(self, request: HttpRequest, plan: NavPlan | None) -> None:
+        object.__setattr__(self, "_request", request)
+        object.__setattr__(self, "_local", {})
+        object.__setattr__(self, "dependencies", set())
+
+        if (
+            plan is not None
+            and plan.has_permissions
+            and plan.get_hidden(request) is not None
+        ):
+            self.dependencies.add("permissions")
+            for name in _PERMISSION_STATE:
+                if (value := getattr(request, name, None)) is not None:
+                    self._local[name] = value
+
+    def __getattr__(self, name: str) -> object:
+        if name.startswith("_django_simple_nav_"):
+            try:
+                return self._local[name]
+            except KeyError:
+                raise AttributeError(name) from None
+
+        if name.startswith("_"):
+            return getattr(self._request, name)
+
+        if (prefix := _MAPPING_DEPENDENCIES.get(name)) is not None:
+            return TrackedMapping(getattr(self._request, name), prefix, self)
+
+        if name == "user" and hasattr(self._request, "user"):
+            return SimpleLazyObject(self._get_user)
+
+        self.dependencies.update(_ATTRIBUTE_DEPENDENCIES.get(name, (UNCACHEABLE,)))
+        return getattr(self._request, name)
+
+    def _get_user(self) -> object:
+        self.dependencies.add("user")
+        return self._request.user
+
+    def __setattr__(self, name: str, value: object) -> None:
+        if not name.startswith("_django_simple_nav_"):
+            self.dependencies.add(UNCACHEABLE)
+            setattr(self._request, name, value)
+            return
+        self._local[name] = value
+
+
+def get_value(request: HttpRequest, dependency: str, plan: NavPlan | None) -> object:
+    """Return the value of `dependency` for `request`, to build a cache key with."""
+    if dependency == "user":
+        return getattr(getattr(request, "user", None), "pk", None)
+    if dependency == "permissions":
+        hidden = plan.get_hidden(request) if plan is not None else None
+        if plan is None or hidden is None:
+            return UNCACHEABLE
+        return sorted(plan.indexes[item_id] for item_id in hidden)
+    if dependency == "path":
+        return request.path
+    if dependency == "query":
+        return sorted(request.GET.lists())
+    if dependency == "host":
+        return (request.scheme, request.get_host())
+    if dependency == "method":
+        return request.method
+
+    prefix, _, key = dependency.partition(":")
+    if prefix == "cookie":
+        return request.COOKIES.get(key)
+    if prefix == "meta":
+        return request.META.get(key)
+    if prefix == "session":
+        session = getattr(request, "session", None)
+        return session.get(key) if session is not None else None
+    return UNCACHEABLE
+
+
+def get_values(
+    request: HttpRequest, dependencies: Iterable[str], plan: NavPlan | None
+) -> list[tuple[str, object]]:
+    """Return each of `dependencies` paired with its value for `request`."""
+    return [
+        (dependency, get_value(request, dependency, plan))
+        for dependency in sorted(dependencies)
+    ]
+
+
+def get_vary_headers(dependencies: Iterable[str]) -> list[str]:
+    """Return the HTTP headers a response varies by when it depends on `dependencies`."""
+    headers: set[str] = set()
+    for dependency in dependencies:
+        prefix, _, key = dependency.partition(":")
+        if dependency in ("user", "permissions") or prefix in ("cookie", "session"):
+            headers.add("Cookie")
+        elif prefix == "meta" and key.startswith("HTTP_"):
+            headers.add(key.removeprefix("HTTP_").replace("_", "-").title())
+    return sorted(headers)
+
+
+def remember(request: HttpRequest, dependencies: Iterable[str]) -> None:
+    """Remember the dependencies of a nav rendered for `request`."""
+    try:
+        remembered: set[str] = request._django_simple_nav_dependencies  # type: ignore[attr-defined]
+    except AttributeError:
+        remembered = set()
+        request._django_simple_nav_dependencies = remembered  # type: ignore[attr-defined]
+    remembered.update(dependencies)
+
+
+def get_remembered(request: HttpRequest) -> set[str]:
+    """Return the dependencies of every nav rendered for `request` so far."""
+    return getattr(request, "_django_simple_nav_dependencies", set())
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import NoReturn
+
+
+class FrozenDict(dict):
+    """A `dict` that can't be changed once built, and so can be hashed.
+
+    It's still a `dict`, so it can be used anywhere one is expected, e.g. when
+    merged into a template context. Its hash is only computed once.
+    """
+
+    __slots__ = ("_hash",)
+
+    _hash: int
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        value = hash(frozenset(self.items()))
+        object.__setattr__(self, "_hash", value)
+        return value
+
+    def __reduce__(self) -> tuple[type[FrozenDict], tuple[dict[object, object]]]:
+        # rebuilt from a plain dict, since unpickling or copying a dict subclass
+        # otherwise sets each key on an empty instance
+        return (type(self), (dict(self),))
+
+    def _immutable(self, *args: object, **kwargs: object) -> NoReturn:
+        msg = f"{type(self).__name__!r} object is immutable"
+        raise TypeError(msg)
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    __ior__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+
+def freeze(value: object) -> object:
+    """Return an immutable, hashable copy of `value`, made with tuples and `FrozenDict`.
+
+    Lists and tuples become tuples, sets become frozensets and mappings become a
+    `FrozenDict`, with their contents frozen as well. Anything else is returned
+    as is.
+
+    >>> freeze({"tags": ["a", "b"]})
+    {'tags': ('a', 'b')}
+    """
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from typing import Literal
+from typing import cast
+
+from django.http import HttpRequest
+from django.urls import get_urlconf
+from django.utils.encoding import escape_uri_path
+from django.utils.translation import get_language
+
+MatchStrategy = Literal["exact", "prefix", "regex", "view_name"]
+
+MATCH_STRATEGIES: frozenset[str] = frozenset({"exact", "prefix", "regex", "view_name"})
+
+
+def _normalize_prefix(prefix: str) -> str:
+    return prefix.rstrip("/")
+
+
+def _path_prefixes(path: str) -> list[str]:
+    """Return every normalized prefix of `path` that ends on a segment boundary.
+
+    >>> _path_prefixes("/docs/intro/")
+    ['', '/docs', '/docs/intro']
+    """
+    path = path.rstrip("/")
+    prefixes = [""]
+    start = 1
+    while (end := path.find("/", start)) != -1:
+        prefixes.append(path[:end])
+        start = end + 1
+    if path:
+        prefixes.append(path)
+    return prefixes
+
+
+def match_prefix(path: str, prefix: str) -> bool:
+    """Check if `path` is `prefix` or lies below it, one path segment at a time.
+
+    >>> match_prefix("/docs/intro/", "/docs/")
+    True
+    >>> match_prefix("/docs-old/", "/docs/")
+    False
+    """
+    prefix = _normalize_prefix(prefix)
+    return path.rstrip("/") == prefix or path.startswith(prefix + "/")
+
+
+def match_regex(path: str, pattern: str) -> bool:
+    """Check if `pattern` matches at the start of `path`, like `re.match()`."""
+    return re.match(pattern, path) is not None
+
+
+# a numbered backreference (`\1`) or conditional (`(?(1)...)`), which would point
+# at the wrong group once the pattern is nested in a combined regex
+_NUMBERED_GROUP_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d")
+
+
+def match_view_name(request: HttpRequest, view_name: str) -> bool:
+    """Check if the request resolved to `view_name` without any captured arguments.
+
+    A nav item declared with a URL name is reversed without arguments, so it only
+    matches a request to the same view that did not capture any from the path.
+    """
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return False
+    return (
+        resolver_match.view_name == view_name
+        and not resolver_match.args
+        and not resolver_match.captured_kwargs
+    )
+
+
+def _constant(value: str) -> Callable[[], str]:
+    return lambda: value
+
+
+class ActiveMatcher:
+    """A prebuilt index of the declarative active-matching strategies in a nav.
+
+    Items are registered once when the matcher is compiled, so the active items
+    for a request can be found with a dict lookup instead of asking each item in
+    turn. Items are treated as opaque objects and tracked by `id()`; the matcher
+    keeps a reference to every registered item, so ids stay valid for as long as
+    the matcher is alive.
+    """
+
+    def __init__(self) -> None:
+        self.view_names: dict[str, list[object]] = {}
+        self.prefix_items: list[tuple[object, Callable[[], str]]] = []
+        self.regex_items: list[tuple[object, str]] = []
+        self.standalone_regex_items: list[tuple[object, str]] = []
+        self.exact_items: list[
+            tuple[object, Callable[[], str | None], Callable[[HttpRequest], bool]]
+        ] = []
+        self.decided: dict[int, object] = {}
+        self.closed: set[int] = set()
+        self.parents: dict[int, object] = {}
+        self._prefix_tables: dict[
+            tuple[str | None, object], dict[str, list[object]]
+        ] = {}
+        self._combined_regex: re.Pattern[str] | Literal[False] | None = None
+        self._exact_tables: dict[
+            tuple[str | None, object],
+            dict[str, list[tuple[object, Callable[[HttpRequest], bool]]]],
+        ] = {}
+
+    def add(self, item: object, parent: object | None) -> None:
+        """Register `item` as a child of `parent` so its ancestors can be found."""
+        if parent is not None:
+            self.parents[id(item)] = parent
+
+    def decide(
+        self,
+        item: object,
+        strategy: MatchStrategy,
+        value: str | Callable[[], str | None] | None,
+        verify: Callable[[HttpRequest], bool] | None = None,
+    ) -> None:
+        """Register `item` as having its own active state decided by `strategy`.
+
+        A `prefix` value may be a callable returning the prefix, which is resolved
+        lazily since it usually comes from reversing a URL. An `exact` value is a
+        callable returning the path of the item's URL, or `None` if it has none,
+        and `verify` does the full comparison against a request for the items
+        whose path matches. Items using the `exact` strategy without a `value` are
+        never active by themselves (e.g. a `NavGroup` without a URL).
+        """
+        if strategy == "view_name":
+            self.view_names.setdefault(cast(str, value), []).append(item)
+        elif strategy == "prefix":
+            prefix = (
+                cast("Callable[[], str]", value)
+                if callable(value)
+                else _constant(cast(str, value))
+            )
+            self.prefix_items.append((item, prefix))
+            self._prefix_tables.clear()
+        elif strategy == "regex":
+            pattern = cast(str, value)
+            if _NUMBERED_GROUP_REFERENCE.search(pattern):
+                self.standalone_regex_items.append((item, pattern))
+            else:
+                self.regex_items.append((item, pattern))
+                self._combined_regex = None
+        elif strategy == "exact" and value is not None:
+            path = value if callable(value) else _constant(value)
+            self.exact_items.append(
+                (item, path, cast("Callable[[HttpRequest], bool]", verify))
+            )
+            self._exact_tables.clear()
+        self.decided[id(item)] = item
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.view_names
+            or self.prefix_items
+            or self.regex_items
+            or self.standalone_regex_items
+            or self.exact_items
+        )
+
+    def get_prefix_table(self) -> dict[str, list[object]]:
+        """Return the table of normalized prefixes to the items that declare them.
+
+        URLs are reversed relative to the active language and URLconf, so a table
+        is built, on first use, for each combination of them.
+        """
+        key = (get_language(), get_urlconf())
+        try:
+            return self._prefix_tables[key]
+        except KeyError:
+            pass
+
+        table: dict[str, list[object]] = {}
+        for item, prefix in self.prefix_items:
+            table.setdefault(_normalize_prefix(prefix()), []).append(item)
+        self._prefix_tables[key] = table
+        return table
+
+    def get_exact_table(
+        self,
+    ) -> dict[str, list[tuple[object, Callable[[HttpRequest], bool]]]]:
+        """Return the table of URL paths, without trailing slashes, to their items.
+
+        Like the prefix table, a table is built for each active language and
+        URLconf, on first use.
+        """
+        key = (get_language(), get_urlconf())
+        try:
+            return self._exact_tables[key]
+        except KeyError:
+            pass
+
+        table: dict[str, list[tuple[object, Callable[[HttpRequest], bool]]]] = {}
+        for item, path, verify in self.exact_items:
+            if (resolved := path()) is not None:
+                table.setdefault(resolved.rstrip("/"), []).append((item, verify))
+        self._exact_tables[key] = table
+        return table
+
+    def get_combined_regex(self) -> re.Pattern[str] | None:
+        """Return all `regex` patterns combined into a single pattern.
+
+        Each pattern is wrapped in an optional lookahead with its own named group,
+        so one `match()` call reports every pattern that matches rather than only
+        the first alternative. Returns `None` if the patterns cannot be combined,
+        e.g. because two of them use the same group name. Patterns that refer to
+        their groups by number are kept out of it, and matched one at a time.
+        """
+        if self._combined_regex is None:
+            combined = "".join(
+                f"(?:(?=(?P<_dsn_{idx}>{pattern})))?"
+                for idx, (_, pattern) in enumerate(self.regex_items)
+            )
+            try:
+                self._combined_regex = re.compile(combined)
+            except re.error:
+                self._combined_regex = False
+        return self._combined_regex or None
+
+    def close(self, item: object) -> None:
+        """Mark `item` as having its own state and whole subtree decided here."""
+        self.closed.add(id(item))
+
+    def match(self, request: HttpRequest) -> tuple[frozenset[int], frozenset[int]]:
+        """Return the ids of the matched items and of all of their ancestors."""
+        matched: set[int] = set()
+
+        resolver_match = getattr(request, "resolver_match", None)
+        if (
+            resolver_match is not None
+            and not resolver_match.args
+            and not resolver_match.captured_kwargs
+        ):
+            matched.update(
+                id(item) for item in self.view_names.get(resolver_match.view_name, ())
+            )
+
+        if self.prefix_items:
+            table = self.get_prefix_table()
+            # percent-encoded like the reversed URLs in the table, and like the
+            # path compared by the `exact` strategy
+            for prefix in _path_prefixes(escape_uri_path(request.path)):
+                matched.update(id(item) for item in table.get(prefix, ()))
+
+        if self.regex_items:
+            if combined := self.get_combined_regex():
+                if regex_match := combined.match(request.path):
+                    matched.update(
+                        id(item)
+                        for idx, (item, _) in enumerate(self.regex_items)
+                        if regex_match.group(f"_dsn_{idx}") is not None
+                    )
+            else:
+                matched.update(
+                    id(item)
+                    for item, pattern in self.regex_items
+                    if match_regex(request.path, pattern)
+                )
+
+        matched.update(
+            id(item)
+            for item, pattern in self.standalone_regex_items
+            if match_regex(request.path, pattern)
+        )
+
+        if self.exact_items:
+            path = escape_uri_path(request.path).rstrip("/")
+            matched.update(
+                id(item)
+                for item, verify in self.get_exact_table().get(path, ())
+                if verify(request)
+            )
+
+        ancestors: set[int] = set()
+        for item_id in matched:
+            parent = self.parents.get(item_id)
+            while parent is not None and id(parent) not in ancestors:
+                ancestors.add(id(parent))
+                parent = self.parents.get(id(parent))
+
+        return frozenset(matched), frozenset(ancestors)
+
+
+def activate(request: HttpRequest, matcher: ActiveMatcher) -> None:
+    """Run `matcher` against `request` once and remember the result on the request."""
+    try:
+        matches: dict[int, tuple[ActiveMatcher, frozenset[int], frozenset[int]]] = (
+            request._django_simple_nav_matches  # type: ignore[attr-defined]
+        )
+    except AttributeError:
+        matches = {}
+        request._django_simple_nav_matches = matches  # type: ignore[attr-defined]
+
+    if id(matcher) not in matches:
+        matches[id(matcher)] = (matcher, *matcher.match(request))
+
+
+def lookup(request: HttpRequest, item: object) -> bool | None:
+    """Return the active state of `item` if a matcher has already decided it.
+
+    Returns `None` when no matcher run against this request can answer for the
+    item, in which case the caller should work it out itself.
+    """
+    matches: dict[int, tuple[ActiveMatcher, frozenset[int], frozenset[int]]] = getattr(
+        request, "_django_simple_nav_matches", {}
+    )
+    item_id = id(item)
+    for matcher, matched, ancestors in matches.values():
+        if matcher.decided.get(item_id) is not item:
+            continue
+        if item_id in matched:
+            return True
+        if item_id in matcher.closed and item_id not in ancestors:
+            return False
+    return None
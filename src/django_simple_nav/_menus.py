@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+from typing import cast
+
+from django.db import models
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+from ._cache import get_cache
+from ._plan import NavPlan
+from .conf import app_settings
+
+if TYPE_CHECKING:
+    from .models import AbstractMenuItem
+    from .nav import NavGroup
+    from .nav import NavItem
+
+MENU_CACHE_PREFIX = "django_simple_nav:menus"
+
+
+@dataclass(frozen=True)
+class MenuTree:
+    """The nav items built from the rows of a menu, and their compiled plan."""
+
+    version: int
+    items: list[NavGroup | NavItem]
+    plan: NavPlan | None
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def is_expired(self) -> bool:
+        timeout = app_settings.MENU_CACHE_TIMEOUT
+        return timeout is not None and time.monotonic() - self.loaded_at >= timeout
+
+
+# the trees loaded by this process, by model, database and query
+_trees: dict[tuple[str, str, str], MenuTree] = {}
+_trees_lock = threading.Lock()
+
+
+def build_items(rows: Iterable[AbstractMenuItem]) -> list[NavGroup | NavItem]:
+    """Assemble the rows of a menu into a tree of nav items, in a single pass.
+
+    Rows are grouped by their parent, then each one is built after all of its
+    children, so every row is visited a constant number of times. Rows whose
+    parent isn't among `rows` are left out, along with their descendants.
+    """
+    rows = list(rows)
+    children: dict[object, list[AbstractMenuItem]] = {}
+    for row in rows:
+        children.setdefault(row.parent_id, []).append(row)  # type: ignore[attr-defined]
+
+    # walk the tree depth first from the roots, then build each row from the
+    # deepest up, so a row's children are always built before the row itself
+    order: list[AbstractMenuItem] = []
+    stack = list(reversed(children.get(None, [])))
+    while stack:
+        row = stack.pop()
+        order.append(row)
+        stack.extend(reversed(children.get(row.pk, [])))
+
+    built: dict[object, NavGroup | NavItem] = {}
+    for row in reversed(order):
+        items = [built.pop(child.pk) for child in children.get(row.pk, [])]
+        built[row.pk] = row.get_nav_item(items)
+    return [built[row.pk] for row in children.get(None, [])]
+
+
+def _get_label(model: type[models.Model]) -> str:
+    # proxies share the rows, and so the version, of their concrete model
+    return cast("type[models.Model]", model._meta.concrete_model)._meta.label_lower
+
+
+def get_version(model: type[models.Model]) -> int:
+    """Return the current version of `model`'s menus in the nav cache."""
+    cache = get_cache()
+    version_key = f"{MENU_CACHE_PREFIX}:{_get_label(model)}:version"
+    version = cache.get(version_key)
+    if version is None:
+        version = 1
+        cache.add(version_key, version, timeout=None)
+    return cast(int, version)
+
+
+def bump_version(sender: type[models.Model], **kwargs: object) -> None:
+    """Invalidate every tree loaded from `sender`, in this and any other process."""
+    label = _get_label(sender)
+    with _trees_lock:
+        for key in [key for key in _trees if key[0] == label]:
+            del _trees[key]
+
+    cache = get_cache()
+    version_key = f"{MENU_CACHE_PREFIX}:{label}:version"
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, 2, timeout=None)
+
+
+def load(
+    queryset: models.QuerySet[AbstractMenuItem],
+    compile_plan: Callable[[list[NavGroup | NavItem]], NavPlan | None],
+) -> MenuTree:
+    """Return the `MenuTree` for the rows of `queryset`, cached per process.
+
+    A tree is loaded with a single query and reused until a row of its model is
+    saved or deleted, which bumps the model's version in the nav cache so other
+    processes load it again too. Changes that don't send signals, such as
+    `QuerySet.update()`, `bulk_create()` or raw SQL, are only picked up once the
+    tree is older than the `MENU_CACHE_TIMEOUT` setting, or after calling
+    `invalidate_menus()`.
+    """
+    model = queryset.model
+    version = get_version(model)
+    key = (_get_label(model), queryset.db, str(queryset.query))
+    tree = _trees.get(key)
+    if tree is not None and tree.version == version and not tree.is_expired():
+        return tree
+
+    items = build_items(queryset)
+    tree = MenuTree(version, items, compile_plan(items))
+    with _trees_lock:
+        _trees[key] = tree
+    return tree
+
+
+def connect_menu_signals() -> None:
+    """Invalidate loaded trees whenever a row of any menu model changes."""
+    from django.apps import apps
+
+    from .models import AbstractMenuItem
+
+    for model in apps.get_models():
+        if issubclass(model, AbstractMenuItem):
+            post_save.connect(bump_version, sender=model)
+            post_delete.connect(bump_version, sender=model)
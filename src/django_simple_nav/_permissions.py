@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import uuid
+from collections.abc import Callable
+from collections.abc import Sequence
+from functools import cache
+from typing import TYPE_CHECKING
+from typing import cast
+
+from django.apps import apps
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.signals import setting_changed
+from django.db import models
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import HttpRequest
+
+from django_simple_nav.conf import app_settings
+
+if TYPE_CHECKING:
+    # only imported for type checking, so projects without `django.contrib.auth`
+    # can still import the nav
+    from django.contrib.auth.models import AbstractUser
+
+PERMISSION_CACHE_PREFIX = "django_simple_nav:permissions"
+
+# the fields of a user whose changes can change the result of `has_perm()`
+USER_PERMISSION_FIELDS = frozenset(
+    {"is_active", "is_superuser", "groups", "user_permissions"}
+)
+
+USER_ATTRIBUTE_PERMISSIONS = frozenset(
+    {
+        "is_anonymous",
+        "is_authenticated",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+    }
+)
+
+
+@cache
+def is_auth_installed() -> bool:
+    """Check once per process whether `django.contrib.auth` is installed."""
+    return apps.is_installed("django.contrib.auth")
+
+
+@receiver(setting_changed)
+def _clear_is_auth_installed(*, setting: str, **kwargs: object) -> None:
+    if setting == "INSTALLED_APPS":
+        is_auth_installed.cache_clear()
+
+
+class RequestPermissions:
+    """The facts about a request's user needed to check nav item permissions.
+
+    Built once per request by `get_request_permissions()`, so checking the
+    permissions of each item only needs a few attribute reads. `checked` holds
+    the result of each permission checked for a whole nav so far, so one used
+    by several navs is only checked once.
+    """
+
+    __slots__ = ("checked", "is_superuser", "user")
+
+    def __init__(self, request: HttpRequest) -> None:
+        # explicitly cast to AbstractUser to make static type checkers happy
+        # `django-stubs` types `request.user` as `django.contrib.auth.base_user.AbstractBaseUser`
+        # as opposed to `django.contrib.auth.models.AbstractUser` or `django.contrib.auth.models.User`
+        # so any type checkers will complain if this is not casted
+        self.user: AbstractUser | None = cast(
+            "AbstractUser | None", getattr(request, "user", None)
+        )
+        self.is_superuser: bool = bool(getattr(self.user, "is_superuser", False))
+        self.checked: dict[str | Callable[[HttpRequest], bool], bool] = {}
+
+
+def get_request_permissions(request: HttpRequest) -> RequestPermissions:
+    """Return the `RequestPermissions` for `request`, cached on the request."""
+    try:
+        return request._django_simple_nav_permissions  # type: ignore[attr-defined]
+    except AttributeError:
+        pass
+
+    permissions = RequestPermissions(request)
+    request._django_simple_nav_permissions = permissions  # type: ignore[attr-defined]
+    return permissions
+
+
+def has_permission(
+    request: HttpRequest,
+    user: AbstractUser,
+    perm: str | Callable[[HttpRequest], bool],
+) -> bool:
+    """Check a single nav item permission for `user`."""
+    if callable(perm):
+        return bool(perm(request))
+    if perm in USER_ATTRIBUTE_PERMISSIONS:
+        return bool(getattr(user, perm, False))
+    return user.has_perm(perm)
+
+
+def get_permission_cache() -> BaseCache | None:
+    """Return the cache configured by `DJANGO_SIMPLE_NAV["PERMISSION_CACHE"]`, if any."""
+    if (alias := app_settings.PERMISSION_CACHE) is None:
+        return None
+    return caches[alias]
+
+
+def _get_version(permission_cache: BaseCache, version_key: str) -> str:
+    version: str | None = permission_cache.get(version_key)
+    if version is None:
+        # a new random version rather than a counter starting over, so entries
+        # cached before the key was evicted are never used again
+        version = uuid.uuid4().hex
+        if not permission_cache.add(version_key, version, timeout=None):
+            version = permission_cache.get(version_key, version)
+    return cast(str, version)
+
+
+def _bump_version(permission_cache: BaseCache, version_key: str) -> None:
+    permission_cache.set(version_key, uuid.uuid4().hex, timeout=None)
+
+
+def get_permission_version(
+    permission_cache: BaseCache, user_pk: object | None = None
+) -> str:
+    """Return the current version of cached permissions in `permission_cache`.
+
+    It combines the version of every user's permissions, bumped when a group or
+    permission changes, with the version of `user_pk`'s own, bumped when only
+    that user changes.
+    """
+    version = _get_version(permission_cache, f"{PERMISSION_CACHE_PREFIX}:version")
+    if user_pk is None:
+        return version
+    user_version = _get_version(
+        permission_cache, f"{PERMISSION_CACHE_PREFIX}:user:{user_pk}:version"
+    )
+    return f"{version}:{user_version}"
+
+
+def bump_permission_version(**kwargs: object) -> None:
+    """Invalidate every user's cached permissions by moving to a new version."""
+    if (permission_cache := get_permission_cache()) is None:
+        return
+    _bump_version(permission_cache, f"{PERMISSION_CACHE_PREFIX}:version")
+
+
+def bump_user_permission_version(user_pk: object) -> None:
+    """Invalidate the cached permissions of the user with `user_pk` only."""
+    if (permission_cache := get_permission_cache()) is None:
+        return
+    _bump_version(permission_cache, f"{PERMISSION_CACHE_PREFIX}:user:{user_pk}:version")
+
+
+def _user_saved(
+    instance: models.Model,
+    update_fields: frozenset[str] | None = None,
+    **kwargs: object,
+) -> None:
+    # e.g. `update_last_login()` on every login, which can't change permissions
+    if update_fields is not None and not update_fields & USER_PERMISSION_FIELDS:
+        return
+    bump_user_permission_version(instance.pk)
+
+
+def _user_deleted(instance: models.Model, **kwargs: object) -> None:
+    bump_user_permission_version(instance.pk)
+
+
+def _user_relations_changed(
+    instance: models.Model,
+    action: str,
+    reverse: bool,
+    pk_set: set[object] | None,
+    **kwargs: object,
+) -> None:
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        # e.g. `user.groups.add(group)`
+        bump_user_permission_version(instance.pk)
+    elif pk_set is not None:
+        # e.g. `group.user_set.add(user)`
+        for user_pk in pk_set:
+            bump_user_permission_version(user_pk)
+    else:
+        # e.g. `group.user_set.clear()`, without saying which users were removed
+        bump_permission_version()
+
+
+def get_cached_permissions(
+    request: HttpRequest,
+    user: AbstractUser,
+    perms: Sequence[str],
+    digest: str,
+) -> dict[str, bool] | None:
+    """Return the results of checking `perms` for `user`, cached across requests.
+
+    `digest` identifies the set of `perms`. Only used when a permission cache is
+    configured and for users that have been saved to the database; returns `None`
+    otherwise.
+    """
+    if user.pk is None or (permission_cache := get_permission_cache()) is None:
+        return None
+
+    version = get_permission_version(permission_cache, user.pk)
+    key = f"{PERMISSION_CACHE_PREFIX}:{version}:{user.pk}:{digest}"
+    results: dict[str, bool] | None = permission_cache.get(key)
+    if results is None:
+        results = {perm: has_permission(request, user, perm) for perm in perms}
+        permission_cache.set(
+            key, results, timeout=app_settings.PERMISSION_CACHE_TIMEOUT
+        )
+    return results
+
+
+def connect_permission_cache_signals() -> None:
+    """Invalidate cached permissions whenever users, groups or permissions change.
+
+    Changes to a group or permission invalidate every user's cached permissions,
+    while changes to a user, or to the groups and permissions they're given,
+    only invalidate that user's.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Group
+    from django.contrib.auth.models import Permission
+
+    user_model = get_user_model()
+    post_save.connect(_user_saved, sender=user_model)
+    post_delete.connect(_user_deleted, sender=user_model)
+    for sender in (Group, Permission):
+        post_save.connect(bump_permission_version, sender=sender)
+        post_delete.connect(bump_permission_version, sender=sender)
+
+    for through in (
+        getattr(getattr(user_model, "groups", None), "through", None),
+        getattr(getattr(user_model, "user_permissions", None), "through", None),
+    ):
+        if through is not None:
+            m2m_changed.connect(_user_relations_changed, sender=through)
+    m2m_changed.connect(bump_permission_version, sender=Group.permissions.through)
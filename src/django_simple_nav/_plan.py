@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import weakref
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from django.http import HttpRequest
+
+from ._matching import ActiveMatcher
+from ._permissions import USER_ATTRIBUTE_PERMISSIONS
+from ._permissions import get_cached_permissions
+from ._permissions import get_request_permissions
+from ._permissions import has_permission
+from ._permissions import is_auth_installed
+
+Permission = str | Callable[[HttpRequest], bool]
+
+
+class NavPlan:
+    """Everything about a nav's declared items that can be worked out ahead of time.
+
+    A plan is compiled once from the static tree of items declared on a `Nav`
+    and reused for every request. Like `ActiveMatcher`, items are treated as
+    opaque objects tracked by `id()`, and the plan keeps a reference to each one
+    in `members` so the ids stay valid for as long as the plan is alive.
+
+    Each distinct permission in the tree is given a bit in `vocabulary`, and the
+    permissions of each item are encoded as a bitmask of the ones it requires.
+    Checking which items a user can see is then a matter of working out which
+    permissions they have been granted, once per request, and a single integer
+    test per item.
+    """
+
+    def __init__(self) -> None:
+        self.matcher = ActiveMatcher()
+        self.members: dict[int, object] = {}
+        # every member in the order it was declared, and the index of each by id,
+        # to refer to items in a way that's the same in every process
+        self.items: tuple[object, ...] = ()
+        self.indexes: dict[int, int] = {}
+        self.vocabulary: dict[Permission, int] = {}
+        # (id, required mask, child ids or `None` for a leaf, has a URL), with
+        # children always listed before their parent
+        self.visibility: list[tuple[int, int, tuple[int, ...] | None, bool]] = []
+        self.hidden: frozenset[int] = frozenset()
+        self.hidden_by_role: dict[int, frozenset[int]] = {}
+        self.cacheable_perms: tuple[str, ...] = ()
+        self.cacheable_digest = ""
+        self.stock_permissions = True
+
+    @property
+    def has_permissions(self) -> bool:
+        return bool(self.vocabulary)
+
+    def add_visibility(
+        self,
+        item: object,
+        permissions: Sequence[Permission],
+        children: Sequence[object] | None,
+        has_url: bool,
+    ) -> None:
+        """Encode the visibility rules for `item`, after those of its `children`."""
+        required = 0
+        for perm in permissions:
+            try:
+                bit = self.vocabulary.setdefault(perm, len(self.vocabulary))
+            except TypeError:
+                # an unhashable callable, so leave it to `check_permissions()`
+                self.stock_permissions = False
+                continue
+            required |= 1 << bit
+
+        child_ids = None if children is None else tuple(id(child) for child in children)
+        self.visibility.append((id(item), required, child_ids, has_url))
+
+    def finalize(self) -> None:
+        """Work out the items hidden for every user that can be known ahead of time.
+
+        That's always the case when every permission has been granted. When the
+        only permissions used are `USER_ATTRIBUTE_PERMISSIONS`, visibility depends
+        on nothing but those few flags on the user, so the hidden items are also
+        worked out for every combination of them, i.e. every possible role.
+        """
+        self.items = tuple(self.members.values())
+        self.indexes = {item_id: idx for idx, item_id in enumerate(self.members)}
+        self.hidden = self.get_hidden_for(~0)
+        self.cacheable_perms = tuple(
+            sorted(
+                perm
+                for perm in self.vocabulary
+                if isinstance(perm, str) and perm not in USER_ATTRIBUTE_PERMISSIONS
+            )
+        )
+        self.cacheable_digest = hashlib.md5(
+            "\n".join(self.cacheable_perms).encode(), usedforsecurity=False
+        ).hexdigest()
+        if self.stock_permissions and all(
+            perm in USER_ATTRIBUTE_PERMISSIONS for perm in self.vocabulary
+        ):
+            self.hidden_by_role = {
+                granted: self.get_hidden_for(granted)
+                for granted in range(1 << len(self.vocabulary))
+            }
+
+    def get_hidden_for(self, granted: int) -> frozenset[int]:
+        """Return the ids of the items hidden given the `granted` permission mask.
+
+        An item is hidden if it requires any permission that hasn't been granted,
+        or if it is a group without a URL and all of its children are hidden.
+        """
+        hidden: set[int] = set()
+        for item_id, required, child_ids, has_url in self.visibility:
+            if required & ~granted or (
+                child_ids is not None
+                and not has_url
+                and all(child_id in hidden for child_id in child_ids)
+            ):
+                hidden.add(item_id)
+        return frozenset(hidden)
+
+    def get_granted(self, request: HttpRequest) -> int:
+        """Return the mask of the permissions in `vocabulary` granted for `request`."""
+        request_permissions = get_request_permissions(request)
+        user = request_permissions.user
+        if user is None:
+            return 0
+        if request_permissions.is_superuser:
+            return ~0
+
+        # shared by every nav rendered for the request
+        checked = request_permissions.checked
+
+        cached: dict[str, bool] = {}
+        if self.cacheable_perms and any(
+            perm not in checked for perm in self.cacheable_perms
+        ):
+            cached = (
+                get_cached_permissions(
+                    request, user, self.cacheable_perms, self.cacheable_digest
+                )
+                or cached
+            )
+
+        granted = 0
+        for perm, bit in self.vocabulary.items():
+            has_perm = checked.get(perm)
+            if has_perm is None:
+                has_perm = cached.get(perm) if isinstance(perm, str) else None
+                if has_perm is None:
+                    has_perm = has_permission(request, user, perm)
+                checked[perm] = has_perm
+            if has_perm:
+                granted |= 1 << bit
+        return granted
+
+    def has_static_visibility(self, request: HttpRequest) -> bool:
+        """Check if every item's visibility for `request` is known ahead of time.
+
+        With the stock `check_permissions()` everywhere in the tree, visibility
+        can't depend on the request when no item declares any permissions, when
+        permissions are not checked at all because `django.contrib.auth` isn't
+        installed, or when the user is a superuser and passes every check. The
+        only items hidden are then the groups in `hidden`: those without a URL
+        and without any visible children.
+        """
+        if not self.stock_permissions:
+            return False
+        if not self.has_permissions or not is_auth_installed():
+            return True
+        request_permissions = get_request_permissions(request)
+        return request_permissions.user is not None and request_permissions.is_superuser
+
+    def get_hidden(self, request: HttpRequest) -> frozenset[int] | None:
+        """Return the ids of the items hidden for `request`.
+
+        Returns `None` if some item overrides `check_permissions()`, in which case
+        the permissions of each item have to be checked one by one. The result is
+        cached on the request.
+        """
+        if not self.stock_permissions:
+            return None
+        if self.has_static_visibility(request):
+            return self.hidden
+        if self.hidden_by_role:
+            return self.hidden_by_role[self.get_granted(request)]
+
+        try:
+            cache: dict[int, tuple[NavPlan, frozenset[int]]] = (
+                request._django_simple_nav_hidden  # type: ignore[attr-defined]
+            )
+        except AttributeError:
+            cache = {}
+            request._django_simple_nav_hidden = cache  # type: ignore[attr-defined]
+
+        if (cached := cache.get(id(self))) is not None:
+            return cached[1]
+
+        hidden = self.get_hidden_for(self.get_granted(request))
+        cache[id(self)] = (self, hidden)
+        return hidden
+
+
+# the plans compiled by this process, by the ids of the items they were compiled
+# from, for as long as some nav still holds on to them
+_shared: weakref.WeakValueDictionary[tuple[int, ...], NavPlan] = (
+    weakref.WeakValueDictionary()
+)
+_shared_lock = threading.Lock()
+
+
+def get_shared(
+    items: Sequence[object], compile_plan: Callable[[Sequence[object]], NavPlan]
+) -> NavPlan:
+    """Return the plan for `items`, compiling it with `compile_plan` if need be.
+
+    Navs that declare the very same item instances, e.g. a subclass that only
+    changes the template, share a single plan, and so the per-request work of
+    matching and checking permissions that is cached on the request by plan.
+    A plan keeps a reference to its items in `members`, so their ids can't be
+    reused while it's around.
+    """
+    key = tuple(id(item) for item in items)
+    with _shared_lock:
+        if (plan := _shared.get(key)) is not None:
+            return plan
+
+    plan = compile_plan(items)
+    with _shared_lock:
+        return _shared.setdefault(key, plan)
+
+
+def activate(request: HttpRequest, plan: NavPlan) -> None:
+    """Work out the visibility of `plan`'s items for `request` ahead of rendering."""
+    if (hidden := plan.get_hidden(request)) is None:
+        return
+
+    try:
+        plans: dict[int, tuple[NavPlan, frozenset[int]]] = (
+            request._django_simple_nav_plans  # type: ignore[attr-defined]
+        )
+    except AttributeError:
+        plans = {}
+        request._django_simple_nav_plans = plans  # type: ignore[attr-defined]
+
+    plans[id(plan)] = (plan, hidden)
+
+
+def get_hidden(request: HttpRequest, item: object) -> frozenset[int] | None:
+    """Return the ids of the hidden items if a plan has worked out `item`'s visibility.
+
+    Returns `None` when no plan activated for this request covers `item`, in
+    which case the permissions of its children have to be checked one by one.
+    """
+    plans: dict[int, tuple[NavPlan, frozenset[int]]] = getattr(
+        request, "_django_simple_nav_plans", {}
+    )
+    for plan, hidden in plans.values():
+        if plan.members.get(id(item)) is item:
+            return hidden
+    return None
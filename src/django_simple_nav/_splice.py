@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from ._plan import NavPlan
+
+Parts = tuple["str | int", ...]
+
+# cached in place of the `SplicedHTML` of a nav whose render turned out to be
+# unspliceable, so it's only recorded once before falling back to plain renders
+UNSPLICEABLE = "unspliceable"
+
+_PLACEHOLDER = "\x00dsn:{}\x00"
+_PLACEHOLDER_RE = re.compile("\x00dsn:(\\d+)\x00")
+
+
+class Unspliceable(Exception):
+    """Raised when a render reads the active state outside of an item's own template."""
+
+
+def _split(html: str) -> Parts:
+    """Split `html` into literal strings and the plan indexes of its placeholders.
+
+    >>> _split("<ul>\\x00dsn:3\\x00</ul>")
+    ('<ul>', 3, '</ul>')
+    """
+    pieces = _PLACEHOLDER_RE.split(html)
+    return tuple(
+        int(piece) if idx % 2 else piece
+        for idx, piece in enumerate(pieces)
+        if idx % 2 or piece
+    )
+
+
+@dataclass(frozen=True)
+class SplicedHTML:
+    """A rendered nav with each self-rendered item left as a slot to fill in.
+
+    `variants` holds the HTML of each item, by its index in the plan, rendered
+    both inactive and active, or `None` for the active HTML when it's the same.
+    Filling in the slots for a request only takes working out which items are
+    active and joining the right strings together.
+    """
+
+    parts: Parts
+    variants: dict[int, tuple[Parts, Parts | None]]
+
+    def assemble(self, is_active: Callable[[int], bool]) -> str:
+        out: list[str] = []
+        self._assemble(self.parts, is_active, out)
+        return "".join(out)
+
+    def _assemble(
+        self, parts: Parts, is_active: Callable[[int], bool], out: list[str]
+    ) -> None:
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            inactive, active = self.variants[part]
+            if active is not None and is_active(part):
+                self._assemble(active, is_active, out)
+            else:
+                self._assemble(inactive, is_active, out)
+
+
+class ActiveProbe:
+    """Stands in for an item's `active` state while recording a spliced render.
+
+    The state is only known ahead of time inside an item's own template, which
+    is rendered once for each state. Reading it anywhere else, e.g. with
+    `{% if item.active %}` in the nav's template, makes the render unspliceable.
+    """
+
+    __slots__ = ("active", "recorder")
+
+    def __init__(self, active: object, recorder: SpliceRecorder) -> None:
+        self.active = active
+        self.recorder = recorder
+
+    def __bool__(self) -> bool:
+        self.recorder.spliceable = False
+        return bool(self.active)
+
+    def __str__(self) -> str:
+        self.recorder.spliceable = False
+        return str(self.active)
+
+
+class SpliceRecorder:
+    """Collects the variants of each self-rendered item during a spliced render."""
+
+    def __init__(self, plan: NavPlan) -> None:
+        self.plan = plan
+        self.variants: dict[int, tuple[Parts, Parts | None]] = {}
+        self.spliceable = True
+
+    def record(self, item: object, render: Callable[[bool], str]) -> str:
+        """Render `item` in both states and return a placeholder for it."""
+        idx = self.plan.indexes.get(id(item))
+        if idx is None or self.plan.items[idx] is not item:
+            # not one of the nav's declared items, so it can't be found again
+            # when filling in the placeholders
+            self.spliceable = False
+            return ""
+
+        inactive = _split(render(False))
+        active = _split(render(True))
+        self.variants[idx] = (inactive, None if active == inactive else active)
+        return _PLACEHOLDER.format(idx)
+
+
+_recorder: ContextVar[SpliceRecorder | None] = ContextVar(
+    "django_simple_nav_splice_recorder", default=None
+)
+
+
+def get_recorder() -> SpliceRecorder | None:
+    """Return the recorder of the spliced render in progress, if any."""
+    return _recorder.get()
+
+
+def record(plan: NavPlan, render: Callable[[], str]) -> SplicedHTML:
+    """Record the `SplicedHTML` of a render of `plan`'s nav.
+
+    Raises `Unspliceable` if the render depends on the active state in a way
+    that can't be filled in later.
+    """
+    recorder = SpliceRecorder(plan)
+    token = _recorder.set(recorder)
+    try:
+        html = render()
+    finally:
+        _recorder.reset(token)
+
+    if not recorder.spliceable:
+        raise Unspliceable
+    return SplicedHTML(_split(html), recorder.variants)
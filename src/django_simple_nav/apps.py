@@ -1,7 +1,20 @@
 from __future__ import annotations
 
 from django.apps import AppConfig
+from django.apps import apps
+
+from ._typing import override
 
 
 class DjangoSimpleNavConfig(AppConfig):
     name = "django_simple_nav"
+
+    @override
+    def ready(self) -> None:
+        from . import checks  # noqa: F401
+        from ._menus import connect_menu_signals
+        from ._permissions import connect_permission_cache_signals
+
+        if apps.is_installed("django.contrib.auth"):
+            connect_permission_cache_signals()
+        connect_menu_signals()
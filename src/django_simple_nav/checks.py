@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from django.apps import AppConfig
+from django.apps import apps
+from django.core import checks
+
+
+@checks.register()
+def check_auth_installed(
+    app_configs: Sequence[AppConfig] | None, **kwargs: object
+) -> list[checks.CheckMessage]:
+    if apps.is_installed("django.contrib.auth"):
+        return []
+
+    return [
+        checks.Warning(
+            "The 'django.contrib.auth' app is not installed, so permissions will not be checked.",
+            hint="Add 'django.contrib.auth' to INSTALLED_APPS, or remove 'permissions' from your nav items.",
+            id="django_simple_nav.W001",
+        )
+    ]
@@ -11,6 +11,10 @@ DJANGO_SIMPLE_NAV_SETTINGS_NAME = "DJANGO_SIMPLE_NAV"
 
 @dataclass(frozen=True)
 class AppSettings:
+    CACHE: str = "default"
+    MENU_CACHE_TIMEOUT: int | None = 300
+    PERMISSION_CACHE: str | None = None
+    PERMISSION_CACHE_TIMEOUT: int | None = 300
     TEMPLATE_BACKEND: str | None = None
 
     @override
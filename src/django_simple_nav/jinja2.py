@@ -1,13 +1,20 @@
 from __future__ import annotations
 
 from collections.abc import Callable
+from collections.abc import Sequence
 
+from django.http import HttpRequest
 from django.utils.module_loading import import_string
+from jinja2 import BaseLoader
+from jinja2 import TemplateError
 from jinja2 import TemplateRuntimeError
 from jinja2 import pass_context
 from jinja2.runtime import Context
 
+from django_simple_nav._cache import get_cache
+from django_simple_nav._cache import make_render_cache_key
 from django_simple_nav.nav import Nav
+from django_simple_nav.nav import render_navs
 
 
 @pass_context
@@ -15,6 +22,9 @@ def django_simple_nav(
     context: Context,
     nav: str | Nav | Callable[..., Nav],
     template_name: str | None = None,
+    cache: int | None = None,
+    vary_on: Sequence[object] = (),
+    max_depth: int | None = None,
 ) -> str:
     """Jinja binding for `django_simple_nav`"""
     if (loader := context.environment.loader) is None:
@@ -24,6 +34,61 @@ def django_simple_nav(
     if request is None:
         raise TemplateRuntimeError("`request` not found in Jinja2 context")
 
+    if cache is None:
+        return _render(context, loader, request, nav, template_name, max_depth)
+
+    # the key is built before resolving the nav, so a cache hit doesn't call a
+    # factory or build any items
+    try:
+        key = make_render_cache_key(nav, template_name, request, vary_on, max_depth)
+    except Exception as err:
+        raise TemplateRuntimeError(str(err)) from err
+    nav_cache = get_cache()
+    rendered: str | None = nav_cache.get(key)
+    if rendered is None:
+        rendered = _render(context, loader, request, nav, template_name, max_depth)
+        nav_cache.set(key, rendered, cache)
+    return rendered
+
+
+@pass_context
+def django_simple_navs(
+    context: Context, **navs: str | Nav | Callable[..., Nav]
+) -> dict[str, str]:
+    """Jinja binding for the `django_simple_navs` template tag.
+
+    Renders each nav passed by keyword in a single call, and returns the HTML of
+    each under its keyword.
+    """
+    if (loader := context.environment.loader) is None:
+        raise TemplateRuntimeError("No template loader in Jinja2 environment")
+
+    request = context.get("request")
+    if request is None:
+        raise TemplateRuntimeError("`request` not found in Jinja2 context")
+
+    resolved = [_resolve(request, nav) for nav in navs.values()]
+    rendered = render_navs(
+        request,
+        resolved,
+        lambda nav: _render_nav(context, loader, request, nav, None),
+    )
+    return dict(zip(navs, rendered, strict=True))
+
+
+def _render(
+    context: Context,
+    loader: BaseLoader,
+    request: HttpRequest,
+    nav: str | Nav | Callable[..., Nav],
+    template_name: str | None,
+    max_depth: int | None = None,
+) -> str:
+    nav_instance = _resolve(request, nav)
+    return _render_nav(context, loader, request, nav_instance, template_name, max_depth)
+
+
+def _resolve(request: HttpRequest, nav: str | Nav | Callable[..., Nav]) -> Nav:
     nav_instance: object
     if isinstance(nav, Nav):
         nav_instance = nav
@@ -46,19 +111,35 @@ def django_simple_nav(
 
     if not isinstance(nav_instance, Nav):
         raise TemplateRuntimeError(f"Not a valid `Nav` instance: {nav_instance}")
+    return nav_instance
 
-    try:
+
+def _render_nav(
+    context: Context,
+    loader: BaseLoader,
+    request: HttpRequest,
+    nav_instance: Nav,
+    template_name: str | None,
+    max_depth: int | None = None,
+) -> str:
+    def render_context(
+        request: HttpRequest, nav_context: dict[str, object], template_name: str | None
+    ) -> str:
         if template_name is None:
             template_name = nav_instance.template_name
         if template_name is None:
             raise TemplateRuntimeError("Navigation object has no template")
-        new_context = {
-            "request": request,
-            **nav_instance.get_context_data(request),
-        }
-    except TemplateRuntimeError:
+        template = loader.load(context.environment, template_name)
+        rendered = template.render({"request": request, **nav_context})
+        return rendered + nav_instance.get_client_active_script()
+
+    # cached like `Nav.render()`, with its `cache_key` and other `cache_*`
+    # options, but keyed apart from the HTML of the Django template engine
+    try:
+        return nav_instance._render_cached(
+            request, template_name, max_depth, render_context, engine="jinja2"
+        )
+    except TemplateError:
         raise
     except Exception as err:
         raise TemplateRuntimeError(str(err)) from err
-
-    return loader.load(context.environment, template_name).render(new_context)
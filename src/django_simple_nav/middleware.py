@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from django.http import HttpRequest
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from ._dependencies import get_remembered
+from ._dependencies import get_vary_headers
+
+
+class NavVaryMiddleware:
+    """Add the `Vary` headers for what the navs rendered for a request depend on.
+
+    Only navs cached with `cache_track_dependencies` know what they depend on,
+    so navs rendered any other way don't add any headers.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+        if headers := get_vary_headers(get_remembered(request)):
+            patch_vary_headers(response, headers)
+        return response
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from django.db import models
+
+from . import _menus
+from .nav import NavGroup
+from .nav import NavItem
+
+
+class AbstractMenuItem(models.Model):
+    """A row of a nav menu stored in the database, for use with `ModelNav`.
+
+    Rows belong to a `menu` and form a tree through `parent`, with siblings
+    sorted by `order`. Subclass it in one of your apps to create the table.
+    """
+
+    menu = models.CharField(max_length=100, db_index=True)
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="children",
+    )
+    title = models.CharField(max_length=255)
+    url = models.CharField(max_length=2048, blank=True)
+    permissions = models.JSONField(default=list, blank=True)
+    order = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ["order", "pk"]
+
+    def __str__(self) -> str:
+        return self.title
+
+    def get_nav_item(self, items: list[NavGroup | NavItem]) -> NavGroup | NavItem:
+        """Return the nav item for this row, given the nav items of its children.
+
+        Rows with children, or without a URL, become a `NavGroup`. Override to
+        set anything else, such as `extra_context` or `match`, from your own
+        fields.
+        """
+        url = self.url or None
+        if items or url is None:
+            return NavGroup(
+                title=self.title,
+                url=url,
+                permissions=list(self.permissions),
+                items=items,
+            )
+        return NavItem(title=self.title, url=url, permissions=list(self.permissions))
+
+
+def invalidate_menus(model: type[AbstractMenuItem]) -> None:
+    """Reload the menus stored in `model` on their next render, in every process.
+
+    Saving or deleting a row does this automatically. Call it after changing
+    rows in ways that don't send signals, such as `QuerySet.update()`,
+    `bulk_create()` or raw SQL.
+    """
+    _menus.bump_version(model)
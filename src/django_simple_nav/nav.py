@@ -1,41 +1,259 @@
 from __future__ import annotations
 
+import contextvars
+import json
 import logging
+import re
 from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from collections.abc import Sequence
+from contextlib import nullcontext
 from dataclasses import dataclass
 from dataclasses import field
+from dataclasses import fields
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from typing import Any
 from typing import cast
 from urllib.parse import parse_qs
 from urllib.parse import urlparse
 from urllib.parse import urlunparse
 
-from django.apps import apps
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
 from django.http import HttpRequest
 from django.template.loader import get_template
 from django.template.loader import render_to_string
+from django.urls import get_urlconf
 from django.urls import reverse
 from django.urls.exceptions import NoReverseMatch
+from django.utils.encoding import escape_uri_path
 from django.utils.functional import Promise
 from django.utils.safestring import mark_safe
-
+from django.utils.translation import get_language
+
+from . import _client
+from . import _dependencies
+from . import _matching
+from . import _menus
+from . import _plan
+from . import _splice
+from ._cache import acquire_lock
+from ._cache import get_cache
+from ._cache import get_cached
+from ._cache import get_or_render
+from ._cache import make_cache_key
+from ._cache import make_digest
+from ._cache import release_lock
+from ._cache import store
+from ._cache import wait_for
+from ._frozen import FrozenDict
+from ._frozen import freeze
+from ._matching import MATCH_STRATEGIES
+from ._matching import MatchStrategy
+from ._matching import match_prefix
+from ._matching import match_regex
+from ._matching import match_view_name
+from ._permissions import USER_ATTRIBUTE_PERMISSIONS  # noqa: F401
+from ._permissions import get_request_permissions
+from ._permissions import has_permission
+from ._permissions import is_auth_installed
+from ._plan import NavPlan
 from ._templates import get_template_engine
 from ._typing import EngineTemplate
 from ._typing import override
 
+if TYPE_CHECKING:
+    from .models import AbstractMenuItem
+
 logger = logging.getLogger(__name__)
 
-USER_ATTRIBUTE_PERMISSIONS = frozenset(
-    {
-        "is_anonymous",
-        "is_authenticated",
-        "is_active",
-        "is_staff",
-        "is_superuser",
-    }
-)
+
+@lru_cache(maxsize=1024)
+def _parse_query(query: str) -> dict[str, list[str]]:
+    """Parse a URL query string, memoized since nav URLs rarely change."""
+    return parse_qs(query)
+
+
+def _get_request_query(request: HttpRequest) -> dict[str, list[str]]:
+    """Return the request's query parameters normalized to match `parse_qs`.
+
+    Django has already parsed the query string into `request.GET`, so reuse that
+    instead of parsing it again for every item. Blank values are dropped, the same
+    as `parse_qs` does by default. The result is cached on the request.
+    """
+    try:
+        return request._django_simple_nav_query  # type: ignore[attr-defined]
+    except AttributeError:
+        pass
+
+    query: dict[str, list[str]] = {}
+    for key, values in request.GET.lists():
+        if non_blank := [value for value in values if value]:
+            query[key] = non_blank
+    request._django_simple_nav_query = query  # type: ignore[attr-defined]
+    return query
+
+
+def _get_request_path(request: HttpRequest) -> str:
+    """Return the request's path, percent-encoded the same way as a reversed URL.
+
+    The result is cached on the request.
+    """
+    try:
+        return request._django_simple_nav_path  # type: ignore[attr-defined]
+    except AttributeError:
+        pass
+
+    path = escape_uri_path(request.path)
+    request._django_simple_nav_path = path  # type: ignore[attr-defined]
+    return path
+
+
+def _get_request_host(request: HttpRequest) -> str:
+    """Return the request's validated host.
+
+    Only needed by items with an absolute URL, so it's computed lazily to avoid
+    validating the host against `ALLOWED_HOSTS` for every item. The result is
+    cached on the request.
+    """
+    try:
+        return request._django_simple_nav_host  # type: ignore[attr-defined]
+    except AttributeError:
+        pass
+
+    host = request.get_host()
+    request._django_simple_nav_host = host  # type: ignore[attr-defined]
+    return host
+
+
+class LazyItems(list):
+    """A list of child items that is only built the first time it's used.
+
+    Behaves exactly like a list once built, so templates can loop over it, check
+    it or take its length as usual. It's built in the same context variables it
+    was created in, so a child built while rendering a template still follows
+    any render mode set up by the `Nav`, e.g. `client_active`.
+    """
+
+    def __init__(self, build: Callable[[], list[object]]) -> None:
+        super().__init__()
+        self._build: Callable[[], list[object]] | None = build
+        self._context = contextvars.copy_context()
+
+    def _evaluate(self) -> None:
+        if (build := self._build) is not None:
+            self._build = None
+            super().extend(self._context.run(build))
+
+    @property
+    def is_evaluated(self) -> bool:
+        return self._build is None
+
+    @override
+    def __reduce__(self) -> tuple[type[list[object]], tuple[list[object]]]:
+        return (list, (list(self),))
+
+
+def _copy_context(context: dict[str, object]) -> dict[str, object]:
+    """Copy an item's context and its list of children, without building them.
+
+    The contexts of the children themselves are shared between the copies.
+    """
+    copied = dict(context)
+    items = copied.get("items")
+    if isinstance(items, LazyItems):
+        copied["items"] = LazyItems(lambda: list(items))
+    elif isinstance(items, list):
+        copied["items"] = list(items)
+    return copied
+
+
+def _evaluating(name: str) -> Callable[..., object]:
+    method = getattr(list, name)
+
+    def wrapper(self: LazyItems, *args: object, **kwargs: object) -> object:
+        self._evaluate()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "__iter__",
+    "__len__",
+    "__getitem__",
+    "__contains__",
+    "__reversed__",
+    "__eq__",
+    "__ne__",
+    "__lt__",
+    "__le__",
+    "__gt__",
+    "__ge__",
+    "__add__",
+    "__mul__",
+    "__rmul__",
+    "__repr__",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "clear",
+    "copy",
+    "count",
+    "extend",
+    "index",
+    "insert",
+    "pop",
+    "remove",
+    "reverse",
+    "sort",
+):
+    setattr(LazyItems, _name, _evaluating(_name))
+
+
+class LazyActive:
+    """An item's active state, only worked out the first time it's used.
+
+    Stands in for the `active` bool of items with a `cache_key`, whose cached
+    HTML is often all a template reads, so a group that has to load its
+    children to find out whether it's active doesn't on a cache hit.
+    """
+
+    __slots__ = ("_get", "_value")
+
+    def __init__(self, get: Callable[[], bool]) -> None:
+        self._get: Callable[[], bool] | None = get
+        self._value = False
+
+    def __bool__(self) -> bool:
+        if (get := self._get) is not None:
+            self._get = None
+            self._value = bool(get())
+        return self._value
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        return bool(self) == other
+
+    @override
+    def __hash__(self) -> int:
+        return hash(bool(self))
+
+    @override
+    def __repr__(self) -> str:
+        return repr(bool(self))
+
+    def __reduce__(self) -> tuple[type[bool], tuple[bool]]:
+        return (bool, (bool(self),))
 
 
 class NavItemContext(dict):
@@ -60,71 +278,584 @@ class NavItemContext(dict):
 
     def __str__(self) -> str:
         if self._rendered is None:
-            self._rendered = self._render()
+            recorder = _splice.get_recorder()
+            if recorder is not None and self._nav_item is not None:
+                self._rendered = recorder.record(self._nav_item, self._render_variant)
+            else:
+                self._rendered = self._render()
         return self._rendered
 
     def __html__(self) -> str:
         return self.__str__()
 
     def _render(self) -> str:
-        if self._nav_item is None or self._request is None:
+        nav_item = self._nav_item
+        request = self._request
+        if nav_item is None or request is None:
             return ""
+
+        cache_key = nav_item.get_cache_key(request)
+        if cache_key is None:
+            return self._render_template(nav_item, request)
+
+        # cache the rendered HTML of this item and its children, so it can be
+        # spliced into an otherwise live render of the nav
+        key = make_cache_key(
+            "item",
+            nav_item.get_content_hash(),
+            cache_key,
+            get_language(),
+            get_urlconf(),
+        )
+        cache = get_cache()
+        rendered: str | None = cache.get(key)
+        if rendered is None:
+            rendered = str(self._render_template(nav_item, request))
+            cache.set(key, rendered, nav_item.get_cache_timeout(request))
+        return mark_safe(rendered)  # noqa: S308
+
+    def _render_template(
+        self, nav_item: NavGroup | NavItem, request: HttpRequest
+    ) -> str:
         context = dict(self)
         return mark_safe(  # noqa: S308
-            render_to_string(self._nav_item.get_template_name(), context, self._request)
+            render_to_string(nav_item.get_template_name(), context, request)
         )
 
+    def _render_variant(self, active: bool) -> str:
+        nav_item = cast("NavGroup | NavItem", self._nav_item)
+        context = {**self, "active": active}
+        return render_to_string(nav_item.get_template_name(), context, self._request)
+
+
+# rows fetched from the database at a time when streaming a queryset of items,
+# the same as `QuerySet.iterator()`'s default
+_QUERYSET_CHUNK_SIZE = 2000
+
+
+def _iter_items(
+    items: Iterable[NavGroup | NavItem] | None,
+) -> Iterator[NavGroup | NavItem]:
+    """Iterate over the items returned by a `get_items()` method, only once.
+
+    A queryset is streamed from the database in chunks rather than having every
+    row loaded into its result cache, unless it has already been evaluated.
+    The contexts built from the items of a `Nav` are still collected into a
+    list, so nothing is streamed to its template at the top level.
+    """
+    if items is None:
+        return iter(())
+    if isinstance(items, QuerySet) and items._result_cache is None:
+        return items.iterator(chunk_size=_QUERYSET_CHUNK_SIZE)
+    return iter(items)
+
 
 def _build_renderable_context(
-    item: NavGroup | NavItem, request: HttpRequest
+    item: NavGroup | NavItem,
+    request: HttpRequest,
+    *,
+    accordion: bool = False,
+    max_depth: int | None = None,
 ) -> NavItemContext:
-    """Build a NavItemContext for a nav item, recursively wrapping children."""
+    """Build a NavItemContext for a nav item, recursively wrapping children.
+
+    With `accordion`, only the groups on the active branch get their children;
+    the others are left with an empty list. `max_depth` is how many levels of
+    items to build, counting `item`'s own, with every group on the last level
+    left with an empty list too.
+    """
     context = item.get_context_data(request)
-    child_items = item.get_items(request)
-    if child_items is not None:
-        context["items"] = [
-            _build_renderable_context(child, request) for child in child_items
-        ]
+    if (recorder := _splice.get_recorder()) is not None:
+        context["active"] = _splice.ActiveProbe(context.get("active"), recorder)
+    if context.get("items") is not None:
+        if (max_depth is not None and max_depth <= 1) or (
+            accordion and not context.get("active")
+        ):
+            context["items"] = []
+        else:
+            child_depth = None if max_depth is None else max_depth - 1
+            # children are only built once a template reads them, so subtrees
+            # that are never shown, e.g. collapsed dropdowns, cost nothing
+            context["items"] = LazyItems(
+                lambda: [
+                    _build_renderable_context(
+                        child, request, accordion=accordion, max_depth=child_depth
+                    )
+                    for child in _iter_items(item.get_items(request))
+                ]
+            )
     return NavItemContext(context, nav_item=item, request=request)
 
 
+def _compile_plan(items: list[NavGroup | NavItem]) -> NavPlan:
+    """Compile the static tree of `items` into a `NavPlan`.
+
+    Only items that use the stock `get_active()` are indexed by the plan's active
+    matcher, since an override could decide the active state any way it likes.
+    Likewise, visibility is only worked out ahead of time when every item uses
+    the stock `check_permissions()`. A group's subtree is only considered closed
+    when its children are the static `items` it was declared with, so a custom
+    `get_items()` always falls back to asking each child.
+    """
+    plan = NavPlan()
+    matcher = plan.matcher
+
+    def register(item: NavGroup | NavItem, parent: NavGroup | None) -> bool:
+        plan.members[id(item)] = item
+        matcher.add(item, parent)
+
+        is_group = isinstance(item, NavGroup)
+        stock_check_permissions = (
+            NavGroup.check_permissions if is_group else NavItem.check_permissions
+        )
+        if type(item).check_permissions is not stock_check_permissions:
+            plan.stock_permissions = False
+
+        children_closed = True
+        if isinstance(item, NavGroup):
+            if type(item).get_items is NavGroup.get_items:
+                for child in item.items:
+                    children_closed = register(child, item) and children_closed
+            else:
+                plan.stock_permissions = False
+                children_closed = False
+            plan.add_visibility(item, item.permissions, item.items, bool(item.url))
+        else:
+            plan.add_visibility(item, item.permissions, None, bool(item.url))
+
+        stock_get_active = NavGroup.get_active if is_group else NavItem.get_active
+        if type(item).get_active is not stock_get_active:
+            return False
+
+        decided = True
+        if item.match == "prefix":
+            matcher.decide(item, "prefix", item._get_prefix)
+        elif item.match != "exact":
+            matcher.decide(item, item.match, cast(str, item._get_pattern()))
+        elif type(item).get_url is (NavGroup.get_url if is_group else NavItem.get_url):
+            matcher.decide(item, "exact", item._get_exact_path, item._match_exact)
+        else:
+            decided = False
+
+        closed = decided and children_closed
+        if closed:
+            matcher.close(item)
+        return closed
+
+    for item in items:
+        register(item, None)
+
+    plan.finalize()
+    return plan
+
+
+def _get_visible_items(
+    request: HttpRequest, items: list[NavGroup | NavItem], plan: NavPlan | None
+) -> list[NavGroup | NavItem]:
+    """Return the `items` the user can see, from `plan` when it can tell."""
+    if plan is not None and (hidden := plan.get_hidden(request)) is not None:
+        return [item for item in items if id(item) not in hidden]
+    return [item for item in items if item.check_permissions(request)]
+
+
+def _activate(request: HttpRequest, plan: NavPlan) -> None:
+    """Work out everything `plan` can ahead of time for `request`."""
+    if plan.matcher:
+        _matching.activate(request, plan.matcher)
+    _plan.activate(request, plan)
+
+
 @dataclass(frozen=True)
 class Nav:
     template_name: str | None = field(init=False, default=None)
     items: list[NavGroup | NavItem] | None = field(init=False, default=None)
+    cache_key: str | None = field(init=False, default=None)
+    cache_timeout: int | None = field(init=False, default=DEFAULT_TIMEOUT)
+    cache_stale_timeout: int | None = field(init=False, default=None)
+    cache_splice_active: bool = field(init=False, default=False)
+    cache_track_dependencies: bool = field(init=False, default=True)
+    client_active: bool = field(init=False, default=False)
+    client_active_script: bool = field(init=False, default=True)
+    accordion: bool = field(init=False, default=False)
 
     def __init__(
         self,
         *,
         template_name: str | None = None,
         items: list[NavGroup | NavItem] | None = None,
+        cache_key: str | None = None,
+        cache_timeout: int | None = DEFAULT_TIMEOUT,
+        cache_stale_timeout: int | None = None,
+        cache_splice_active: bool | None = None,
+        cache_track_dependencies: bool | None = None,
+        client_active: bool | None = None,
+        client_active_script: bool | None = None,
+        accordion: bool | None = None,
     ) -> None:
         if template_name is not None:
             object.__setattr__(self, "template_name", template_name)
         if items is not None:
             object.__setattr__(self, "items", items)
+        if cache_key is not None:
+            object.__setattr__(self, "cache_key", cache_key)
+        if cache_timeout is not DEFAULT_TIMEOUT:
+            object.__setattr__(self, "cache_timeout", cache_timeout)
+        if cache_stale_timeout is not None:
+            object.__setattr__(self, "cache_stale_timeout", cache_stale_timeout)
+        if cache_splice_active is not None:
+            object.__setattr__(self, "cache_splice_active", cache_splice_active)
+        if cache_track_dependencies is not None:
+            object.__setattr__(
+                self, "cache_track_dependencies", cache_track_dependencies
+            )
+        if client_active is not None:
+            object.__setattr__(self, "client_active", client_active)
+        if client_active_script is not None:
+            object.__setattr__(self, "client_active_script", client_active_script)
+        if accordion is not None:
+            object.__setattr__(self, "accordion", accordion)
+
+    def render(
+        self,
+        request: HttpRequest,
+        template_name: str | None = None,
+        max_depth: int | None = None,
+    ) -> str:
+        return self._render_cached(request, template_name, max_depth)
+
+    def _render_cached(
+        self,
+        request: HttpRequest,
+        template_name: str | None,
+        max_depth: int | None,
+        render_context: Callable[[HttpRequest, dict[str, object], str | None], str]
+        | None = None,
+        engine: str | None = None,
+    ) -> str:
+        """Render the nav, cached as set up by its `cache_*` options.
+
+        `render_context` renders the context with another template engine than
+        the Django one, e.g. Jinja2, and `engine` names it in the cache keys.
+        """
+
+        def render(request: HttpRequest) -> str:
+            return self._render(request, template_name, max_depth, render_context)
+
+        cache_key = self.get_cache_key(request)
+        if cache_key is None:
+            return render(request)
+
+        vary_on: tuple[object, ...] = (cache_key, template_name, max_depth)
+        if engine is not None:
+            vary_on = (cache_key, engine, template_name, max_depth)
+        if self.cache_splice_active:
+            return self._render_spliced(request, render, vary_on)
+        if self.cache_track_dependencies:
+            return self._render_tracked(request, render, vary_on)
 
-    def render(self, request: HttpRequest, template_name: str | None = None) -> str:
-        context = self.get_context_data(request)
+        return mark_safe(  # noqa: S308
+            get_or_render(
+                self._make_cache_key("nav", *vary_on),
+                request,
+                lambda request: str(render(request)),
+                self.get_cache_timeout(request),
+                self.get_cache_stale_timeout(request),
+            )
+        )
+
+    def evaluate(
+        self, request: HttpRequest, max_depth: int | None = None
+    ) -> EvaluatedNav:
+        """Evaluate the nav for `request` once, to output as both HTML and JSON.
+
+        Unlike `render()`, nothing is cached, since the result is only meant to
+        be used for the current request.
+        """
+        return EvaluatedNav(self, request, self._get_context(request, max_depth))
+
+    def _get_context(
+        self, request: HttpRequest, max_depth: int | None
+    ) -> dict[str, object]:
+        if max_depth is None:
+            # keeps overrides of `get_context_data()` without `max_depth` working
+            return self.get_context_data(request)
+        return self.get_context_data(request, max_depth=max_depth)
+
+    def _render(
+        self,
+        request: HttpRequest,
+        template_name: str | None = None,
+        max_depth: int | None = None,
+        render_context: Callable[[HttpRequest, dict[str, object], str | None], str]
+        | None = None,
+    ) -> str:
+        context = self._get_context(request, max_depth)
+        if render_context is None:
+            render_context = self._render_context
+        return render_context(request, context, template_name)
+
+    def _render_context(
+        self,
+        request: HttpRequest,
+        context: dict[str, object],
+        template_name: str | None = None,
+    ) -> str:
         template = self.get_template(template_name)
         if isinstance(template, str):
             engine = get_template_engine()
             template: EngineTemplate = engine.from_string(template)  # type: ignore[no-redef]
-        return template.render(context, request)
+        rendered = template.render(context, request)
+        if script := self.get_client_active_script():
+            rendered = mark_safe(rendered + script)  # noqa: S308
+        return rendered
 
-    def get_context_data(self, request: HttpRequest) -> dict[str, object]:
-        items = self.get_items(request)
-        return {
-            "items": [_build_renderable_context(item, request) for item in items],
-        }
+    def _render_tracked(
+        self,
+        request: HttpRequest,
+        render: Callable[[HttpRequest], str],
+        vary_on: tuple[object, ...],
+    ) -> str:
+        """Render the nav from HTML cached under a key built from what it depends on.
+
+        Every render that misses the cache records which parts of the request it
+        reads. The cache key is then `vary_on` plus the value of each part read
+        by any render of the nav so far, which are kept in the cache as well. Any
+        render that reads something that can't be captured in a key is not
+        cached.
+        """
+        cache = get_cache()
+        plan = self.get_plan()
+        vary_on = (*vary_on, get_language(), get_urlconf())
+        dependencies_key = self._make_cache_key("dependencies", *vary_on)
+
+        def get_key(dependencies: frozenset[str]) -> str:
+            values = _dependencies.get_values(request, dependencies, plan)
+            return self._make_cache_key("nav", *vary_on, *values)
+
+        def lookup() -> str | None:
+            dependencies: frozenset[str] | None = cache.get(dependencies_key)
+            if dependencies is None or _dependencies.UNCACHEABLE in dependencies:
+                return None
+            entry: tuple[str, float | None] | None = cache.get(get_key(dependencies))
+            return None if entry is None else entry[0]
+
+        timeout = self.get_cache_timeout(request)
+        stale_timeout = self.get_cache_stale_timeout(request)
+
+        known: frozenset[str] | None = cache.get(dependencies_key)
+        if known is not None:
+            _dependencies.remember(request, known)
+            if _dependencies.UNCACHEABLE in known:
+                return render(request)
+            if (
+                rendered := get_cached(
+                    get_key(known),
+                    request,
+                    lambda request: str(render(request)),
+                    timeout,
+                    stale_timeout,
+                )
+            ) is not None:
+                return mark_safe(rendered)  # noqa: S308
+
+        # only one worker renders a missing entry at a time, locked by the key
+        # it's expected to be cached under, or by the nav's dependencies when
+        # they aren't known yet
+        lock_key = dependencies_key if known is None else get_key(known)
+        locked = acquire_lock(lock_key)
+        if not locked and (rendered := wait_for(lookup)) is not None:
+            return mark_safe(rendered)  # noqa: S308
+
+        try:
+            tracked = _dependencies.TrackedRequest(request, plan)
+            rendered = render(cast(HttpRequest, tracked))
+            dependencies = frozenset(tracked.dependencies | (known or frozenset()))
+            _dependencies.remember(request, dependencies)
+            if dependencies != known:
+                cache.set(dependencies_key, dependencies, None)
+            if _dependencies.UNCACHEABLE not in dependencies:
+                store(get_key(dependencies), str(rendered), timeout, stale_timeout)
+        finally:
+            if locked:
+                release_lock(lock_key)
+        return rendered
+
+    def _render_spliced(
+        self,
+        request: HttpRequest,
+        render: Callable[[HttpRequest], str],
+        vary_on: tuple[object, ...],
+    ) -> str:
+        """Render the nav from HTML cached once for every page, per permission set.
+
+        Only the active state of the items differs from page to page, so each
+        item's own template is cached rendered in both states and the right one
+        is filled in for each request. Falls back to an uncached render when the
+        visible items can't be worked out ahead of time, or the nav's template
+        reads the active state of its items directly.
+        """
+        plan = self.get_plan()
+        hidden = None if plan is None else plan.get_hidden(request)
+        if (
+            plan is None
+            or hidden is None
+            or (self.accordion and not self.client_active)
+        ):
+            # an accordion's collapsed groups depend on the active branch, so
+            # its HTML can't be shared between pages
+            return render(request)
+
+        def record(request: HttpRequest) -> _splice.SplicedHTML | str:
+            try:
+                return _splice.record(plan, lambda: str(render(request)))
+            except _splice.Unspliceable:
+                return _splice.UNSPLICEABLE
+
+        key = self._make_cache_key(
+            "spliced",
+            *vary_on,
+            get_language(),
+            get_urlconf(),
+            sorted(plan.indexes[item_id] for item_id in hidden),
+        )
+        spliced = get_or_render(
+            key,
+            request,
+            record,
+            self.get_cache_timeout(request),
+            self.get_cache_stale_timeout(request),
+        )
+        if not isinstance(spliced, _splice.SplicedHTML):
+            return render(request)
+
+        if self.client_active:
+            # the active state is left to the browser, so every item is filled
+            # in inactive and the HTML stays the same on every page
+            return mark_safe(spliced.assemble(lambda idx: False))  # noqa: S308
 
-    def get_items(self, request: HttpRequest) -> list[NavGroup | NavItem]:
+        _activate(request, plan)
+        items = cast("tuple[NavItem, ...]", plan.items)
+        return mark_safe(  # noqa: S308
+            spliced.assemble(lambda idx: items[idx].get_active(request))
+        )
+
+    def get_context_data(
+        self, request: HttpRequest, max_depth: int | None = None
+    ) -> dict[str, object]:
+        """Return the context for the nav's template.
+
+        `max_depth` limits how many levels of items are built, e.g. `1` for only
+        the top-level items, leaving the `items` of every group on the last
+        level empty.
+        """
+        if max_depth is not None and max_depth < 1:
+            msg = f"'max_depth' must be at least 1, got {max_depth!r}"
+            raise ValueError(msg)
+
+        if (plan := self.get_plan()) is not None:
+            if self.client_active:
+                # the active state is left to the browser, so there's nothing
+                # to match against the request
+                _plan.activate(request, plan)
+            else:
+                _activate(request, plan)
+
+        # the active branch isn't known on the server when it's left to the
+        # browser, so every group stays expanded
+        accordion = self.accordion and not self.client_active
+        with _client.client_active() if self.client_active else nullcontext():
+            items = self.get_items(request)
+            return {
+                "items": [
+                    _build_renderable_context(
+                        item, request, accordion=accordion, max_depth=max_depth
+                    )
+                    for item in _iter_items(items)
+                ],
+            }
+
+    def get_client_active_script(self) -> str:
+        """Return the script that marks the active items in the browser, if any."""
+        if self.client_active and self.client_active_script:
+            return _client.ACTIVE_SCRIPT
+        return ""
+
+    def get_items(self, request: HttpRequest) -> Iterable[NavGroup | NavItem]:
+        """Return the items the user can see.
+
+        Overrides can return any iterable, such as a generator or a queryset,
+        which is consumed once and lazily while the nav is rendered.
+        """
         if self.items is not None:
-            return [item for item in self.items if item.check_permissions(request)]
+            return _get_visible_items(request, self.items, self.get_plan())
 
         msg = f"{self.__class__!r} must define 'items' or override 'get_items()'"
         raise ImproperlyConfigured(msg)
 
+    def get_plan(self) -> NavPlan | None:
+        """Return the compiled `NavPlan` for the declared `items`.
+
+        The plan is cached on the class when `items` is a class attribute, so it
+        is only compiled once per process rather than once per render. Otherwise
+        it is cached on the instance. Navs that declare the very same item
+        instances share one plan.
+        """
+        if self.items is None:
+            return None
+
+        cls = type(self)
+        for namespace in (self.__dict__, cls.__dict__):
+            cached = namespace.get("_plan")
+            if cached is not None and cached[0] is self.items:
+                return cached[1]
+
+        plan = _plan.get_shared(self.items, _compile_plan)  # type: ignore[arg-type]
+        if self.items is cls.items:
+            cls._plan = (self.items, plan)  # type: ignore[attr-defined]
+        else:
+            object.__setattr__(self, "_plan", (self.items, plan))
+        return plan
+
+    def get_content_hash(self) -> str:
+        """Return a digest of the nav's definition, the same in every process.
+
+        It covers the nav's class and options, such as `template_name`, and the
+        content hash of each of its declared items, and is part of every key the
+        nav caches HTML under. Deploying a change to any of them makes the nav
+        miss the cache rather than serve HTML rendered from the old definition.
+        """
+        try:
+            return self.__dict__["_content_hash"]
+        except KeyError:
+            pass
+
+        options = [
+            (f.name, getattr(self, f.name)) for f in fields(self) if f.name != "items"
+        ]
+        digest = make_digest(type(self), options, self._get_declared_items())
+        object.__setattr__(self, "_content_hash", digest)
+        return digest
+
+    def _get_declared_items(self) -> list[NavGroup | NavItem] | None:
+        return self.items
+
+    def _make_cache_key(self, name: str, *vary_on: object) -> str:
+        return make_cache_key(name, self.get_content_hash(), *vary_on)
+
+    def get_cache_key(self, request: HttpRequest) -> str | None:
+        """Return the key to cache the rendered nav under, or `None` to not cache it.
+
+        The key must capture everything the rendered HTML depends on, such as the
+        user and the active page.
+        """
+        return self.cache_key
+
+    def get_cache_timeout(self, request: HttpRequest) -> int | None:
+        return self.cache_timeout
+
+    def get_cache_stale_timeout(self, request: HttpRequest) -> int | None:
+        return self.cache_stale_timeout
+
     def get_template(self, template_name: str | None = None) -> EngineTemplate:
         template_name = template_name or self.get_template_name()
         template = get_template(template_name=template_name)
@@ -138,27 +869,252 @@ class Nav:
         raise ImproperlyConfigured(msg)
 
 
+@dataclass(frozen=True)
+class ModelNav(Nav):
+    """A `Nav` whose items are the rows of a menu stored in the database.
+
+    `model` is a subclass of `AbstractMenuItem` and `menu` the name of the menu
+    to show. The whole menu is loaded with a single query and built into nav
+    items once per process, then reused until a row of `model` is saved or
+    deleted.
+    """
+
+    model: type[AbstractMenuItem] | None = field(init=False, default=None)
+    menu: str | None = field(init=False, default=None)
+
+    def __init__(
+        self,
+        *,
+        model: type[AbstractMenuItem] | None = None,
+        menu: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        if model is not None:
+            object.__setattr__(self, "model", model)
+        if menu is not None:
+            object.__setattr__(self, "menu", menu)
+
+    def get_queryset(self) -> QuerySet[AbstractMenuItem]:
+        """Return the rows of the menu, in the order siblings are shown in."""
+        if self.model is None:
+            msg = f"{self.__class__!r} must define 'model' or override 'get_queryset()'"
+            raise ImproperlyConfigured(msg)
+        if self.menu is None:
+            msg = f"{self.__class__!r} must define 'menu' or override 'get_queryset()'"
+            raise ImproperlyConfigured(msg)
+        return self.model._default_manager.filter(menu=self.menu)
+
+    @override
+    def get_items(self, request: HttpRequest) -> Iterable[NavGroup | NavItem]:
+        tree = self._get_tree()
+        return _get_visible_items(request, tree.items, tree.plan)
+
+    @override
+    def get_plan(self) -> NavPlan | None:
+        return self._get_tree().plan
+
+    @override
+    def _get_declared_items(self) -> list[NavGroup | NavItem] | None:
+        return self._get_tree().items
+
+    def _get_tree(self) -> _menus.MenuTree:
+        # loaded once per instance, so rendering only checks the version of the
+        # cached tree once
+        try:
+            return self.__dict__["_menu_tree"]
+        except KeyError:
+            pass
+        tree = _menus.load(self.get_queryset(), _compile_plan)
+        object.__setattr__(self, "_menu_tree", tree)
+        return tree
+
+
+@dataclass(frozen=True)
+class EvaluatedNav:
+    """A nav's context evaluated for a request, returned by `Nav.evaluate()`.
+
+    It can be rendered as HTML, turned into JSON, or both, and the items are
+    only evaluated once. Groups whose children were never read by a template
+    are built the first time they're needed, by either output.
+    """
+
+    nav: Nav
+    request: HttpRequest
+    context: dict[str, object]
+
+    def render(self, template_name: str | None = None) -> str:
+        """Render the nav as HTML, as `Nav.render()` does but without any caching."""
+        return self.nav._render_context(self.request, self.context, template_name)
+
+    def to_data(self) -> object:
+        """Return the context as plain dicts and lists, without rendering any HTML."""
+        return _to_data(self.context)
+
+    def to_json(self, **kwargs: Any) -> str:
+        """Return the context as JSON, passing any `kwargs` on to `json.dumps()`.
+
+        Lazy strings, such as URLs from `reverse_lazy()`, are encoded with
+        Django's `DjangoJSONEncoder` unless another `cls` is given.
+        """
+        kwargs.setdefault("cls", DjangoJSONEncoder)
+        return json.dumps(self.to_data(), **kwargs)
+
+
+def _to_data(value: object) -> object:
+    if isinstance(value, LazyActive):
+        return bool(value)
+    if isinstance(value, Mapping):
+        # drops the `NavItemContext` wrapper of each item, and the HTML with it
+        return {key: _to_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        # iterated rather than handed to the encoder, since a `LazyItems` is
+        # empty until built
+        return [_to_data(item) for item in value]
+    return value
+
+
+def render_navs(
+    request: HttpRequest,
+    navs: Iterable[Nav],
+    render: Callable[[Nav], str] | None = None,
+) -> list[str]:
+    """Render each of `navs` for `request`, returning their HTML in the same order.
+
+    This is a convenience loop over `Nav.render()`, or over `render` when given,
+    as the Jinja2 function does to render with its own environment. It doesn't
+    batch anything itself: the work that doesn't depend on the nav is kept on
+    the request by every render, so each distinct permission is checked once
+    however many navs use it, and an item that's part of several navs is
+    matched and evaluated once, whether or not the navs are rendered here.
+    """
+    if render is None:
+        return [nav.render(request) for nav in navs]
+    return [render(nav) for nav in navs]
+
+
 @dataclass(frozen=True)
 class NavItem:
     title: str
     url: str | Callable[..., str] | Promise | None = None
-    permissions: list[str | Callable[[HttpRequest], bool]] = field(default_factory=list)
-    extra_context: dict[str, object] = field(default_factory=dict)
+    permissions: Sequence[str | Callable[[HttpRequest], bool]] = ()
+    extra_context: Mapping[str, object] = field(default_factory=FrozenDict)
     append_slash: bool | None = None
     template_name: str | None = None
+    match: MatchStrategy = "exact"
+    pattern: str | None = None
+    cache_key: str | Callable[[HttpRequest], str | None] | None = None
+    cache_timeout: int | Callable[[HttpRequest], int | None] | None = DEFAULT_TIMEOUT
+
+    def __post_init__(self) -> None:
+        # stored immutably, so items can be hashed and used as keys
+        object.__setattr__(self, "permissions", tuple(self.permissions))
+        object.__setattr__(self, "extra_context", freeze(self.extra_context))
+
+        if self.match not in MATCH_STRATEGIES:
+            msg = f"{self.__class__!r} has an unknown 'match' strategy: {self.match!r}"
+            raise ImproperlyConfigured(msg)
+        if self.match == "view_name" and not isinstance(self._get_pattern(), str):
+            msg = f"{self.__class__!r} must set 'url' or 'pattern' to a URL name to use 'match=\"view_name\"'"
+            raise ImproperlyConfigured(msg)
+        if self.match == "prefix" and self.pattern is None and self.url is None:
+            msg = f"{self.__class__!r} must set 'url' or 'pattern' to use 'match=\"prefix\"'"
+            raise ImproperlyConfigured(msg)
+        if self.match == "regex":
+            if self.pattern is None:
+                msg = f"{self.__class__!r} must set 'pattern' to use 'match=\"regex\"'"
+                raise ImproperlyConfigured(msg)
+            try:
+                re.compile(self.pattern)
+            except re.error as err:
+                msg = f"{self.__class__!r} has an invalid 'pattern': {err}"
+                raise ImproperlyConfigured(msg) from err
+
+    def __hash__(self) -> int:
+        # memoized, since hashing a group hashes its whole subtree
+        try:
+            return self.__dict__["_hash"]
+        except KeyError:
+            pass
+        value = hash((type(self), *(getattr(self, f.name) for f in fields(self))))
+        object.__setattr__(self, "_hash", value)
+        return value
+
+    def __getstate__(self) -> dict[str, object]:
+        # hashes of strings differ from process to process
+        state = self.__dict__.copy()
+        state.pop("_hash", None)
+        if state.get("cache_timeout") is DEFAULT_TIMEOUT:
+            # the sentinel wouldn't survive being copied, so it's left to fall
+            # back to the class's default
+            del state["cache_timeout"]
+        return state
+
+    def get_content_hash(self) -> str:
+        """Return a digest of the item's definition, the same in every process.
+
+        It covers the item's class and fields, including the content hash of
+        each child of a group, and is computed once per item.
+        """
+        try:
+            return self.__dict__["_content_hash"]
+        except KeyError:
+            pass
+
+        options = [(f.name, getattr(self, f.name)) for f in fields(self)]
+        digest = make_digest(type(self), options)
+        object.__setattr__(self, "_content_hash", digest)
+        return digest
 
     def get_context_data(self, request: HttpRequest) -> dict[str, object]:
-        context = {
-            "title": self.get_title(),
-            "url": self.get_url(),
-            "active": self.get_active(request),
-            "items": self.get_items(request),
-        }
+        # worked out once per request for each item, however many navs it's
+        # part of, and copied, along with its list of children, since callers
+        # are free to change what they get
+        client_active = _client.is_client_active()
+        try:
+            evaluated: dict[tuple[int, bool], tuple[NavItem, dict[str, object]]] = (
+                request._django_simple_nav_items  # type: ignore[attr-defined]
+            )
+        except AttributeError:
+            evaluated = {}
+            request._django_simple_nav_items = evaluated  # type: ignore[attr-defined]
+
+        key = (id(self), client_active)
+        if (cached := evaluated.get(key)) is not None and cached[0] is self:
+            return _copy_context(cached[1])
+
+        context = self._evaluate_context(request, client_active=client_active)
+        evaluated[key] = (self, context)
+        return _copy_context(context)
+
+    def _evaluate_context(
+        self, request: HttpRequest, *, client_active: bool
+    ) -> dict[str, object]:
+        if client_active:
+            url = self.get_url()
+            context = {
+                "title": self.get_title(),
+                "url": url,
+                "active": False,
+                "items": self._get_context_items(request),
+                **_client.get_client_context(self, url),
+            }
+        else:
+            context = {
+                "title": self.get_title(),
+                "url": self.get_url(),
+                "active": (
+                    self.get_active(request)
+                    if self.cache_key is None
+                    else LazyActive(lambda: self.get_active(request))
+                ),
+                "items": self._get_context_items(request),
+            }
         # filter out any items in `extra_context` that may be shadowing the
         # above `context` dict
         extra_context = {
             key: value
-            for key, value in self.extra_context.copy().items()
+            for key, value in self.extra_context.items()
             if context.get(key) is None
         }
         return {
@@ -166,6 +1122,9 @@ class NavItem:
             **extra_context,
         }
 
+    def _get_context_items(self, request: HttpRequest) -> object:
+        return self.get_items(request)
+
     def get_template_name(self) -> str:
         if self.template_name is not None:
             return self.template_name
@@ -174,6 +1133,16 @@ class NavItem:
     def render(self, request: HttpRequest) -> str:
         return str(_build_renderable_context(self, request))
 
+    def get_cache_key(self, request: HttpRequest) -> str | None:
+        if callable(self.cache_key):
+            return self.cache_key(request)
+        return self.cache_key
+
+    def get_cache_timeout(self, request: HttpRequest) -> int | None:
+        if callable(self.cache_timeout):
+            return self.cache_timeout(request)
+        return self.cache_timeout
+
     def get_title(self) -> str:
         return mark_safe(self.title)  # noqa: S308
 
@@ -218,6 +1187,18 @@ class NavItem:
         raise ImproperlyConfigured(msg)
 
     def get_active(self, request: HttpRequest) -> bool:
+        if (active := _matching.lookup(request, self)) is not None:
+            return active
+
+        if self.match == "view_name":
+            return match_view_name(request, cast(str, self._get_pattern()))
+        if self.match == "prefix":
+            return match_prefix(_get_request_path(request), self._get_prefix())
+        if self.match == "regex":
+            return match_regex(request.path, cast(str, self.pattern))
+        return self._match_exact(request)
+
+    def _match_exact(self, request: HttpRequest) -> bool:
         try:
             url = self.get_url()
         except ImproperlyConfigured:
@@ -227,15 +1208,16 @@ class NavItem:
             return False
 
         parsed_url = urlparse(url)
-        parsed_request = urlparse(request.build_absolute_uri())
 
-        if (parsed_url.scheme and (parsed_url.scheme != parsed_request.scheme)) or (
-            parsed_url.netloc and (parsed_url.netloc != parsed_request.netloc)
-        ):
+        # most nav URLs are relative, so only look at the scheme and host of the
+        # request when the URL actually has them
+        if parsed_url.scheme and parsed_url.scheme != request.scheme:
+            return False
+        if parsed_url.netloc and parsed_url.netloc != _get_request_host(request):
             return False
 
         url_path = parsed_url.path
-        request_path = parsed_request.path
+        request_path = _get_request_path(request)
 
         should_append = (
             self.append_slash
@@ -246,12 +1228,27 @@ class NavItem:
             url_path = url_path.rstrip("/") + "/"
             request_path = request_path.rstrip("/") + "/"
 
-        url_query = parse_qs(parsed_url.query)
-        request_query = parse_qs(parsed_request.query)
+        if url_path != request_path:
+            return False
 
-        return url_path == request_path and url_query == request_query
+        return _parse_query(parsed_url.query) == _get_request_query(request)
 
-    def get_items(self, request: HttpRequest) -> list[NavGroup | NavItem] | None:
+    def _get_exact_path(self) -> str | None:
+        try:
+            url = self.get_url()
+        except ImproperlyConfigured:
+            return None
+        return urlparse(url).path or None
+
+    def _get_pattern(self) -> object:
+        return self.pattern if self.pattern is not None else self.url
+
+    def _get_prefix(self) -> str:
+        if self.pattern is not None:
+            return self.pattern
+        return urlparse(self.get_url()).path
+
+    def get_items(self, request: HttpRequest) -> Iterable[NavGroup | NavItem] | None:
         # this needs to be set to shadow the built-in `items()` of the dict
         # returned by this method for `NavItem`. otherwise when looping through
         # the items in a `Nav`, calling `{% if item.items %}` will resolve to `True`.
@@ -263,13 +1260,14 @@ class NavItem:
         return None
 
     def check_permissions(self, request: HttpRequest) -> bool:
-        if not apps.is_installed("django.contrib.auth"):
-            logger.warning(
-                "The 'django.contrib.auth' app is not installed, so permissions will not be checked."
-            )
+        if not is_auth_installed():
+            # warned about once by the `django_simple_nav.W001` system check
             return True
 
-        if not hasattr(request, "user"):
+        request_permissions = get_request_permissions(request)
+        user = request_permissions.user
+
+        if user is None:
             # if no user attached to request, we assume that the user is not authenticated
             # and we should hide if *any* permissions are set
             return not self.permissions
@@ -277,38 +1275,23 @@ class NavItem:
         if not self.permissions:
             return True
 
-        # explicitly cast to AbstractUser to make static type checkers happy
-        # `django-stubs` types `request.user` as `django.contrib.auth.base_user.AbstractBaseUser`
-        # as opposed to `django.contrib.auth.models.AbstractUser` or `django.contrib.auth.models.User`
-        # so any type checkers will complain if this is not casted
-        user = cast(AbstractUser, request.user)
-
-        permission_checks: list[bool] = []
-
-        for idx, perm in enumerate(self.permissions):
-            has_perm = False
-
-            if getattr(user, "is_superuser", False):
-                permission_checks.append(True)
-                break
-            if callable(perm):
-                has_perm = perm(request)
-            elif perm in USER_ATTRIBUTE_PERMISSIONS:
-                has_perm = getattr(user, perm, False)
-            else:
-                has_perm = user.has_perm(perm)
-
-            permission_checks.append(has_perm)
-
-            if idx != len(self.permissions) - 1:
-                continue
+        if request_permissions.is_superuser:
+            return True
 
-        return all(permission_checks)
+        return all(has_permission(request, user, perm) for perm in self.permissions)
 
 
 @dataclass(frozen=True)
 class NavGroup(NavItem):
-    items: list[NavGroup | NavItem] = field(default_factory=list)
+    items: Sequence[NavGroup | NavItem] = ()
+
+    # otherwise replaced by the dataclass with one that isn't memoized
+    __hash__ = NavItem.__hash__
+
+    @override
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "items", tuple(self.items))
+        super().__post_init__()
 
     @override
     def get_template_name(self) -> str:
@@ -317,16 +1300,20 @@ class NavGroup(NavItem):
         return "django_simple_nav/navgroup.html"
 
     @override
-    def get_context_data(self, request: HttpRequest) -> dict[str, object]:
-        context = super().get_context_data(request)
-
-        items = self.get_items(request)
-        context["items"] = [item.get_context_data(request) for item in items]
-
-        return context
+    def _get_context_items(self, request: HttpRequest) -> object:
+        # not even the visible children are worked out until a template reads
+        # them, so a group only costs what it takes to show its own header
+        return LazyItems(
+            lambda: [
+                item.get_context_data(request)
+                for item in _iter_items(self.get_items(request))
+            ]
+        )
 
     @override
-    def get_items(self, request: HttpRequest) -> list[NavGroup | NavItem]:
+    def get_items(self, request: HttpRequest) -> Iterable[NavGroup | NavItem]:
+        if (hidden := _plan.get_hidden(request, self)) is not None:
+            return [item for item in self.items if id(item) not in hidden]
         return [item for item in self.items if item.check_permissions(request)]
 
     @override
@@ -339,9 +1326,11 @@ class NavGroup(NavItem):
 
     @override
     def get_active(self, request: HttpRequest) -> bool:
+        if (active := _matching.lookup(request, self)) is not None:
+            return active
         if super().get_active(request):
             return True
-        items = self.get_items(request)
+        items = _iter_items(self.get_items(request))
         return any(item.get_active(request) for item in items)
 
     @override
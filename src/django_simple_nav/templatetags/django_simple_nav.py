@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+from typing import cast
+
 from django import template
 from django.http import HttpRequest
 from django.template.base import Parser
 from django.template.base import Token
 from django.template.context import Context
 from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
 
+from django_simple_nav._cache import get_cache
+from django_simple_nav._cache import make_render_cache_key
 from django_simple_nav._typing import override
 from django_simple_nav.nav import Nav
+from django_simple_nav.nav import render_navs
 
 register = template.Library()
 
@@ -20,75 +26,128 @@ def do_django_simple_nav(parser: Parser, token: Token) -> DjangoSimpleNavNode:
     if not args:
         raise template.TemplateSyntaxError(f"{tag_name} tag requires arguments")
 
-    nav = args[0]
+    nav, *options = args
     template_name = None
+    cache = None
+    vary_on: list[str] = []
+    max_depth = None
 
-    if len(args) > 2:
-        raise template.TemplateSyntaxError(f"{tag_name} received too many arguments")
-
-    if len(args) == 2:
-        arg = args[1]
-        if "=" in arg:
-            key, template_name = arg.split("=", 1)
-            if key != "template_name":
+    for idx, arg in enumerate(options):
+        if "=" not in arg:
+            if idx > 0:
                 raise template.TemplateSyntaxError(
-                    f"Unknown argument to {tag_name}: {key}"
+                    f"{tag_name} received too many arguments"
                 )
-        else:
             template_name = arg
+            continue
 
-    return DjangoSimpleNavNode(nav, template_name)
+        key, value = arg.split("=", 1)
+        if key == "template_name":
+            template_name = value
+        elif key == "cache":
+            cache = value
+        elif key == "vary_on":
+            vary_on.append(value)
+        elif key == "max_depth":
+            max_depth = value
+        else:
+            raise template.TemplateSyntaxError(f"Unknown argument to {tag_name}: {key}")
+
+    if vary_on and cache is None:
+        raise template.TemplateSyntaxError(
+            f"{tag_name} only accepts 'vary_on' along with 'cache'"
+        )
+
+    return DjangoSimpleNavNode(
+        nav, template_name, cache=cache, vary_on=vary_on, max_depth=max_depth
+    )
 
 
 class DjangoSimpleNavNode(template.Node):
-    def __init__(self, nav: str, template_name: str | None) -> None:
+    def __init__(
+        self,
+        nav: str,
+        template_name: str | None,
+        *,
+        cache: str | None = None,
+        vary_on: list[str] | None = None,
+        max_depth: str | None = None,
+    ) -> None:
         self.nav = template.Variable(nav)
         self.template_name = template.Variable(template_name) if template_name else None
+        self.cache = template.Variable(cache) if cache else None
+        self.vary_on = [template.Variable(var) for var in vary_on or []]
+        self.max_depth = template.Variable(max_depth) if max_depth else None
 
     @override
     def render(self, context: Context) -> str:
         request = self.get_request(context)
-        nav = self.get_nav(context, request)
         template_name = self.get_template_name(context)
+        max_depth = self.get_max_depth(context)
 
-        return nav.render(request, template_name)
+        if self.cache is None:
+            nav = self.get_nav(context, request)
+            return _render(nav, request, template_name, max_depth)
 
-    def get_nav(self, context: Context, request: HttpRequest) -> Nav:
+        # the key is built before resolving the nav, so a cache hit doesn't
+        # call a factory or build any items
+        key = self.get_cache_key(context, request, template_name, max_depth)
+        cache = get_cache()
+        rendered: str | None = cache.get(key)
+        if rendered is None:
+            nav = self.get_nav(context, request)
+            rendered = str(_render(nav, request, template_name, max_depth))
+            cache.set(key, rendered, self.get_cache_timeout(context))
+        return mark_safe(rendered)  # noqa: S308
+
+    def get_cache_timeout(self, context: Context) -> int | None:
+        timeout = self._resolve(cast(template.Variable, self.cache), context)
+        if timeout is None:
+            return None
         try:
-            nav: str | Nav = self.nav.resolve(context)
-        except template.VariableDoesNotExist as err:
+            return int(cast("int | str", timeout))
+        except (TypeError, ValueError) as err:
             raise template.TemplateSyntaxError(
-                f"Variable does not exist: {err}"
+                f"Invalid 'cache' timeout: {timeout!r}"
             ) from err
 
-        if isinstance(nav, Nav):
-            return nav
+    def get_cache_key(
+        self,
+        context: Context,
+        request: HttpRequest,
+        template_name: str | None,
+        max_depth: int | None = None,
+    ) -> str:
+        nav = self._resolve(self.nav, context)
+        vary_on = [self._resolve(var, context) for var in self.vary_on]
+        return make_render_cache_key(nav, template_name, request, vary_on, max_depth)
 
-        if isinstance(nav, str):
-            try:
-                imported: object = import_string(nav)
-            except ImportError as err:
-                raise template.TemplateSyntaxError(
-                    f"Failed to import from dotted string: {nav}"
-                ) from err
-
-            if isinstance(imported, type):
-                # Class (Nav subclass or otherwise) - instantiate with no args
-                nav_instance: object = imported()
-            elif callable(imported):
-                # Callable factory - call with request
-                nav_instance = imported(request)
-            else:
-                nav_instance = imported
-        else:
-            nav_instance = nav
+    def get_max_depth(self, context: Context) -> int | None:
+        if self.max_depth is None:
+            return None
+        max_depth = self._resolve(self.max_depth, context)
+        if max_depth is None:
+            return None
+        try:
+            depth = int(max_depth)  # type: ignore[call-overload]
+        except (TypeError, ValueError) as err:
+            raise template.TemplateSyntaxError(
+                f"Invalid 'max_depth': {max_depth!r}"
+            ) from err
+        if depth < 1:
+            raise template.TemplateSyntaxError(f"Invalid 'max_depth': {max_depth!r}")
+        return depth
 
-        if not isinstance(nav_instance, Nav):
+    def _resolve(self, var: template.Variable, context: Context) -> object:
+        try:
+            return var.resolve(context)
+        except template.VariableDoesNotExist as err:
             raise template.TemplateSyntaxError(
-                f"Not a valid `Nav` instance: {nav_instance}"
-            )
+                f"Variable does not exist: {err}"
+            ) from err
 
-        return nav_instance
+    def get_nav(self, context: Context, request: HttpRequest) -> Nav:
+        return _get_nav(self.nav, context, request)
 
     def get_template_name(self, context: Context) -> str | None:
         try:
@@ -103,16 +162,109 @@ class DjangoSimpleNavNode(template.Node):
         return template_name
 
     def get_request(self, context: Context) -> HttpRequest:
-        request = context.get("request", None)
+        return _get_request(context)
+
+
+@register.tag(name="django_simple_navs")
+def do_django_simple_navs(parser: Parser, token: Token) -> DjangoSimpleNavsNode:
+    tag_name, *args = token.split_contents()
+
+    if len(args) < 3 or args[-2] != "as":
+        raise template.TemplateSyntaxError(
+            f"{tag_name} tag requires 'name=nav' arguments followed by 'as variable'"
+        )
 
-        if not request:
+    *pairs, _, target = args
+    navs: dict[str, str] = {}
+    for arg in pairs:
+        if "=" not in arg:
             raise template.TemplateSyntaxError(
-                f"`request` not found in template context: {context}"
+                f"{tag_name} expects each nav as 'name=nav', got: {arg}"
             )
-
-        if not isinstance(request, HttpRequest):
+        name, nav = arg.split("=", 1)
+        if name in navs:
             raise template.TemplateSyntaxError(
-                f"`request` not a valid `HttpRequest`: {request}"
+                f"{tag_name} received more than one nav named {name!r}"
             )
+        navs[name] = nav
+
+    return DjangoSimpleNavsNode(navs, target)
+
+
+class DjangoSimpleNavsNode(template.Node):
+    def __init__(self, navs: dict[str, str], target: str) -> None:
+        self.navs = {name: template.Variable(nav) for name, nav in navs.items()}
+        self.target = target
+
+    @override
+    def render(self, context: Context) -> str:
+        request = _get_request(context)
+        navs = [_get_nav(nav, context, request) for nav in self.navs.values()]
+        context[self.target] = {
+            name: mark_safe(rendered)  # noqa: S308
+            for name, rendered in zip(
+                self.navs, render_navs(request, navs), strict=True
+            )
+        }
+        return ""
+
+
+def _render(
+    nav: Nav, request: HttpRequest, template_name: str | None, max_depth: int | None
+) -> str:
+    if max_depth is None:
+        # keeps overrides of `Nav.render()` without `max_depth` working
+        return nav.render(request, template_name)
+    return nav.render(request, template_name, max_depth)
+
+
+def _get_nav(var: template.Variable, context: Context, request: HttpRequest) -> Nav:
+    try:
+        nav: str | Nav = var.resolve(context)
+    except template.VariableDoesNotExist as err:
+        raise template.TemplateSyntaxError(f"Variable does not exist: {err}") from err
+
+    if isinstance(nav, Nav):
+        return nav
+
+    if isinstance(nav, str):
+        try:
+            imported: object = import_string(nav)
+        except ImportError as err:
+            raise template.TemplateSyntaxError(
+                f"Failed to import from dotted string: {nav}"
+            ) from err
+
+        if isinstance(imported, type):
+            # Class (Nav subclass or otherwise) - instantiate with no args
+            nav_instance: object = imported()
+        elif callable(imported):
+            # Callable factory - call with request
+            nav_instance = imported(request)
+        else:
+            nav_instance = imported
+    else:
+        nav_instance = nav
+
+    if not isinstance(nav_instance, Nav):
+        raise template.TemplateSyntaxError(
+            f"Not a valid `Nav` instance: {nav_instance}"
+        )
+
+    return nav_instance
+
+
+def _get_request(context: Context) -> HttpRequest:
+    request = context.get("request", None)
+
+    if not request:
+        raise template.TemplateSyntaxError(
+            f"`request` not found in template context: {context}"
+        )
+
+    if not isinstance(request, HttpRequest):
+        raise template.TemplateSyntaxError(
+            f"`request` not a valid `HttpRequest`: {request}"
+        )
 
-        return request
+    return request
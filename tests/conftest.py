@@ -5,7 +5,9 @@ from pathlib import Path
 
 import pytest
 from django.conf import settings
+from django.core.cache import caches
 from django.http import HttpRequest
+from django.test import override_settings
 
 from .settings import DEFAULT_SETTINGS
 
@@ -44,3 +46,12 @@ def req():
     request = HttpRequest()
     request.META = {"HTTP_HOST": "test"}
     return request
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    ):
+        yield caches["default"]
+        caches["default"].clear()
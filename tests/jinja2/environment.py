@@ -6,9 +6,12 @@ from jinja2 import Environment
 from jinja2 import FileSystemLoader
 
 from django_simple_nav.jinja2 import django_simple_nav
+from django_simple_nav.jinja2 import django_simple_navs
 
 # Ensure the same template paths are valid for both Jinja2 and Django templates
 loader = FileSystemLoader("tests/jinja2/")
 
 environment = Environment(loader=loader, trim_blocks=True)
-environment.globals.update({"django_simple_nav": django_simple_nav})
+environment.globals.update(
+    {"django_simple_nav": django_simple_nav, "django_simple_navs": django_simple_navs}
+)
@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from django_simple_nav.models import AbstractMenuItem
+
+
+class MenuItem(AbstractMenuItem):
+    pass
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+
+from django_simple_nav.checks import check_auth_installed
+
+
+def test_check_auth_installed():
+    assert check_auth_installed(None) == []
+
+
+@override_settings(
+    INSTALLED_APPS=[
+        app for app in settings.INSTALLED_APPS if app != "django.contrib.auth"
+    ]
+)
+def test_check_auth_not_installed():
+    errors = check_auth_installed(None)
+
+    assert len(errors) == 1
+    assert errors[0].id == "django_simple_nav.W001"
+
+
+def test_setup_without_auth():
+    # a new process, since the test settings have already imported the auth
+    # models into this one
+    code = (
+        "import django\n"
+        "from django.conf import settings\n"
+        "settings.configure(INSTALLED_APPS=['django_simple_nav'])\n"
+        "django.setup()\n"
+        "from django.core import checks\n"
+        "print(*[message.id for message in checks.run_checks()])\n"
+    )
+    src = Path(__file__).parent.parent / "src"
+
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=src,
+        text=True,
+    )
+
+    assert result.stdout.split() == ["django_simple_nav.W001"]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from unittest.mock import patch
+
 import pytest
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
@@ -192,3 +194,96 @@ def test_bad_callable(req):
 
     with pytest.raises(TemplateRuntimeError):
         template.render({"request": req})
+
+
+def test_templatetag_with_client_active_nav(req):
+    class ClientActiveNav(DummyNav):
+        client_active = True
+
+    template = environment.from_string("{{ django_simple_nav(new_nav) }}")
+    req.user = AnonymousUser()
+    rendered_template = template.render({"request": req, "new_nav": ClientActiveNav()})
+    assert rendered_template.endswith("</script>")
+
+
+def test_templatetag_with_cache(req, locmem_cache):
+    template = environment.from_string(
+        "{{ django_simple_nav('tests.navs.DummyNav', cache=60, vary_on=[theme]) }}"
+    )
+    req.user = AnonymousUser()
+    rendered_template = template.render({"request": req, "theme": "dark"})
+
+    with patch("django_simple_nav.jinja2.import_string") as import_string:
+        assert template.render({"request": req, "theme": "dark"}) == rendered_template
+        import_string.assert_not_called()
+
+    assert count_anchors(rendered_template) == 7
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"cache_track_dependencies": False},
+        {"cache_splice_active": True},
+    ],
+)
+def test_templatetag_with_nav_cache_key(req, options, locmem_cache):
+    nav = DummyNav(cache_key="main", **options)
+    template = environment.from_string("{{ django_simple_nav(nav) }}")
+    req.user = AnonymousUser()
+    rendered_template = template.render({"request": req, "nav": nav})
+
+    with patch.object(DummyNav, "get_items") as get_items:
+        assert template.render({"request": req, "nav": nav}) == rendered_template
+        get_items.assert_not_called()
+
+    assert count_anchors(rendered_template) == 7
+    # cached apart from the HTML of the Django template engine
+    assert nav.render(req) != rendered_template
+
+
+def test_templatetag_with_max_depth(req):
+    template = environment.from_string(
+        "{{ django_simple_nav('tests.navs.DummyNav', max_depth=1) }}"
+    )
+    req.user = AnonymousUser()
+    rendered_template = template.render({"request": req})
+    assert count_anchors(rendered_template) == 4
+
+
+def test_batch(req):
+    template = environment.from_string(
+        "{% set navs = django_simple_navs(main='tests.navs.DummyNav', alt=alt_nav) %}"
+        "{{ navs.alt }}|{{ navs.main }}"
+    )
+    req.user = AnonymousUser()
+    rendered_template = template.render(
+        {"request": req, "alt_nav": DummyNav(template_name="tests/alternate.html")}
+    )
+    alt, main = rendered_template.split("|")
+    assert "This is an alternate template." in alt
+    assert count_anchors(main) == 7
+
+
+def test_batch_uses_render_navs(req):
+    template = environment.from_string(
+        "{{ django_simple_navs(main='tests.navs.DummyNav').main }}"
+    )
+    req.user = AnonymousUser()
+
+    with patch(
+        "django_simple_nav.jinja2.render_navs", return_value=["rendered"]
+    ) as render_navs:
+        assert template.render({"request": req}) == "rendered"
+
+    (navs,) = [call.args[1] for call in render_navs.call_args_list]
+    assert [type(nav) for nav in navs] == [DummyNav]
+
+
+def test_batch_request_not_in_context():
+    template = environment.from_string(
+        "{{ django_simple_navs(main='tests.navs.DummyNav') }}"
+    )
+    with pytest.raises(TemplateRuntimeError):
+        template.render()
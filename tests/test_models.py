@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from django_simple_nav import _menus
+from django_simple_nav._cache import get_nav_identity
+from django_simple_nav.models import invalidate_menus
+from django_simple_nav.nav import ModelNav
+from django_simple_nav.nav import NavGroup
+from django_simple_nav.nav import NavItem
+from tests.models import MenuItem
+from tests.utils import count_anchors
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_trees():
+    _menus._trees.clear()
+    yield
+    _menus._trees.clear()
+
+
+@pytest.fixture
+def menu():
+    docs = baker.make(MenuItem, menu="main", title="Docs", url="/docs/", order=1)
+    baker.make(MenuItem, menu="main", title="Home", url="/", order=0)
+    baker.make(
+        MenuItem, menu="main", parent=docs, title="Intro", url="/docs/intro/", order=1
+    )
+    baker.make(
+        MenuItem,
+        menu="main",
+        parent=docs,
+        title="Staff",
+        url="/docs/staff/",
+        permissions=["is_staff"],
+        order=0,
+    )
+    baker.make(MenuItem, menu="footer", title="Legal", url="/legal/")
+
+
+@pytest.fixture
+def nav(menu):
+    return ModelNav(template_name="tests/dummy_nav.html", model=MenuItem, menu="main")
+
+
+def test_build_items(menu):
+    items = _menus.build_items(MenuItem.objects.filter(menu="main"))
+
+    assert items == [
+        NavItem(title="Home", url="/"),
+        NavGroup(
+            title="Docs",
+            url="/docs/",
+            items=[
+                NavItem(title="Staff", url="/docs/staff/", permissions=["is_staff"]),
+                NavItem(title="Intro", url="/docs/intro/"),
+            ],
+        ),
+    ]
+
+
+def test_build_items_without_url():
+    baker.make(MenuItem, menu="main", title="Section", url="")
+
+    (item,) = _menus.build_items(MenuItem.objects.all())
+
+    assert item == NavGroup(title="Section")
+
+
+def test_build_items_orphans_left_out(menu):
+    docs = MenuItem.objects.get(title="Docs")
+
+    items = _menus.build_items(MenuItem.objects.exclude(pk=docs.pk))
+
+    assert [item.title for item in items] == ["Home", "Legal"]
+
+
+def test_render(req, nav):
+    req.user = AnonymousUser()
+
+    rendered = nav.render(req)
+
+    assert count_anchors(rendered) == 3
+    assert "Staff" not in rendered
+    assert "Legal" not in rendered
+
+
+def test_single_query_cached_per_process(req, nav):
+    req.user = AnonymousUser()
+
+    with CaptureQueriesContext(connection) as queries:
+        nav.render(req)
+    assert len(queries) == 1
+
+    with CaptureQueriesContext(connection) as queries:
+        ModelNav(template_name=nav.template_name, model=MenuItem, menu="main").render(
+            req
+        )
+    assert len(queries) == 0
+
+
+def test_plan_compiled_once(nav):
+    other = ModelNav(model=MenuItem, menu="main")
+
+    assert nav.get_plan() is other.get_plan()
+
+
+def test_invalidated_on_save(req, nav):
+    req.user = AnonymousUser()
+    nav.render(req)
+
+    MenuItem.objects.filter(title="Home").update(title="Start")
+    MenuItem.objects.get(title="Start").save()
+
+    rendered = ModelNav(
+        template_name=nav.template_name, model=MenuItem, menu="main"
+    ).render(req)
+    assert "Start" in rendered
+
+
+def test_invalidated_on_delete(req, nav):
+    req.user = AnonymousUser()
+    nav.render(req)
+
+    MenuItem.objects.get(title="Home").delete()
+
+    rendered = ModelNav(
+        template_name=nav.template_name, model=MenuItem, menu="main"
+    ).render(req)
+    assert "Home" not in rendered
+
+
+def test_invalidated_in_other_processes(nav, locmem_cache):
+    tree = nav._get_tree()
+
+    # another process saving a row only bumps the version in the shared cache
+    locmem_cache.incr(f"{_menus.MENU_CACHE_PREFIX}:tests.menuitem:version")
+
+    assert ModelNav(model=MenuItem, menu="main")._get_tree() is not tree
+
+
+def test_invalidated_manually(nav):
+    tree = nav._get_tree()
+
+    MenuItem.objects.filter(title="Home").update(title="Start")
+    assert ModelNav(model=MenuItem, menu="main")._get_tree() is tree
+
+    invalidate_menus(MenuItem)
+    assert ModelNav(model=MenuItem, menu="main")._get_tree() is not tree
+
+
+def test_reloaded_after_timeout(nav, settings):
+    tree = nav._get_tree()
+
+    settings.DJANGO_SIMPLE_NAV = {"MENU_CACHE_TIMEOUT": 0}
+
+    assert ModelNav(model=MenuItem, menu="main")._get_tree() is not tree
+
+
+def test_no_timeout(nav, settings):
+    settings.DJANGO_SIMPLE_NAV = {"MENU_CACHE_TIMEOUT": None}
+    tree = nav._get_tree()
+
+    assert ModelNav(model=MenuItem, menu="main")._get_tree() is tree
+
+
+def test_menus_cached_separately(req, nav):
+    req.user = AnonymousUser()
+    footer = ModelNav(template_name=nav.template_name, model=MenuItem, menu="footer")
+
+    assert "Legal" in footer.render(req)
+    assert "Legal" not in nav.render(req)
+
+
+def test_model_improperly_configured():
+    with pytest.raises(ImproperlyConfigured, match="model"):
+        ModelNav(menu="main").get_queryset()
+
+
+def test_menu_improperly_configured():
+    with pytest.raises(ImproperlyConfigured, match="menu"):
+        ModelNav(model=MenuItem).get_queryset()
+
+
+def test_subclass(req, menu):
+    class MainNav(ModelNav):
+        template_name = "tests/dummy_nav.html"
+        model = MenuItem
+        menu = "main"
+
+    req.user = AnonymousUser()
+
+    assert count_anchors(MainNav().render(req)) == 3
+
+
+def test_cache_identity(nav):
+    footer = ModelNav(template_name=nav.template_name, model=MenuItem, menu="footer")
+
+    assert get_nav_identity(nav) != get_nav_identity(footer)
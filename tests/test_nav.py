@@ -1,17 +1,37 @@
 from __future__ import annotations
 
+import json
+import time
+from unittest.mock import patch
+
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models.query import ModelIterable
+from django.http import HttpResponse
 from django.template.backends.django import Template as DjangoTemplate
 from django.template.backends.jinja2 import Template as JinjaTemplate
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.urls import reverse_lazy
+from django.utils import translation
 from model_bakery import baker
 
+from django_simple_nav import _dependencies
+from django_simple_nav import _matching
+from django_simple_nav._cache import get_nav_identity
+from django_simple_nav._cache import get_refresh_executor
+from django_simple_nav._cache import make_cache_key
+from django_simple_nav.middleware import NavVaryMiddleware
 from django_simple_nav.nav import Nav
+from django_simple_nav.nav import NavGroup
 from django_simple_nav.nav import NavItem
+from django_simple_nav.nav import render_navs
+from tests.models import MenuItem
 from tests.navs import DummyNav
 from tests.utils import count_anchors
 
@@ -133,6 +153,70 @@ def test_get_items_override(req):
     assert len(items) == 1
 
 
+def test_get_items_generator(req):
+    class GeneratorNav(Nav):
+        template_name = "tests/dummy_nav.html"
+
+        def get_items(self, request):
+            yield NavItem(title="Home", url="/")
+            yield NavGroup(
+                title="Group",
+                items=[NavItem(title="Child", url="/child/")],
+            )
+
+    rendered_nav = GeneratorNav().render(req)
+
+    assert count_anchors(rendered_nav) == 3
+
+
+def test_get_items_queryset_streamed(req):
+    queryset = get_user_model().objects.all()
+
+    class QuerySetNav(Nav):
+        template_name = "tests/dummy_nav.html"
+
+        def get_items(self, request):
+            return queryset
+
+    with patch.object(
+        type(queryset),
+        "iterator",
+        autospec=True,
+        return_value=iter([NavItem(title="Home", url="/")]),
+    ) as iterator:
+        rendered_nav = QuerySetNav().render(req)
+
+    assert count_anchors(rendered_nav) == 1
+    iterator.assert_called_once_with(queryset, chunk_size=2000)
+    # the rows were never loaded into the queryset's result cache
+    assert queryset._result_cache is None
+
+
+def test_get_items_queryset_of_models(req):
+    class NavItemIterable(ModelIterable):
+        def __iter__(self):
+            for row in super().__iter__():
+                yield row.get_nav_item([])
+
+    baker.make(MenuItem, menu="main", title="Home", url="/", order=0)
+    baker.make(MenuItem, menu="main", title="Docs", url="/docs/", order=1)
+    queryset = MenuItem.objects.filter(menu="main")
+    queryset._iterable_class = NavItemIterable
+
+    class QuerySetNav(Nav):
+        template_name = "tests/dummy_nav.html"
+
+        def get_items(self, request):
+            return queryset
+
+    with CaptureQueriesContext(connection) as queries:
+        rendered_nav = QuerySetNav().render(req)
+
+    assert count_anchors(rendered_nav) == 2
+    assert len(queries) == 1
+    assert queryset._result_cache is None
+
+
 def test_get_items_improperly_configured(req):
     class GetItemsNav(Nav):
         template_name = ...
@@ -284,3 +368,1345 @@ class TestNavConstructor:
         nav = Nav(template_name="tests/dummy_nav.html", items=items)
 
         assert len(nav.get_items(req)) == 2
+
+
+class TestActiveMatcher:
+    """Tests for the compiled, nav-level active matching."""
+
+    @pytest.fixture
+    def view_name_req(self, rf):
+        req = rf.get("/fake-view/")
+        req.resolver_match = resolve("/fake-view/")
+        req.user = AnonymousUser()
+        return req
+
+    def test_view_name_index(self):
+        item = NavItem(title=..., url="fake-view", match="view_name")
+        nav = Nav(items=[NavGroup(title=..., items=[item])])
+
+        matcher = nav.get_plan().matcher
+
+        assert matcher.view_names == {"fake-view": [item]}
+
+    def test_cached_on_class(self):
+        class ViewNameNav(Nav):
+            items = [NavItem(title=..., url="fake-view", match="view_name")]
+
+        assert ViewNameNav().get_plan() is ViewNameNav().get_plan()
+
+    def test_no_items(self):
+        class GetItemsNav(Nav):
+            def get_items(self, request):
+                return []
+
+        assert GetItemsNav().get_plan() is None
+
+    def test_group_active_through_view_name_child(self, view_name_req):
+        nav = Nav(
+            items=[
+                NavGroup(
+                    title="Group",
+                    items=[
+                        NavItem(title="Fake", url="fake-view", match="view_name"),
+                        NavItem(title="Home", url="home", match="view_name"),
+                    ],
+                ),
+                NavGroup(
+                    title="Other",
+                    items=[NavItem(title="Home", url="home", match="view_name")],
+                ),
+            ]
+        )
+
+        context = nav.get_context_data(view_name_req)
+
+        group, other = context["items"]
+        assert group["active"] is True
+        assert [item["active"] for item in group["items"]] == [True, False]
+        assert other["active"] is False
+
+    def test_group_not_active_through_hidden_child(self, view_name_req):
+        nav = Nav(
+            items=[
+                NavGroup(
+                    title="Group",
+                    url="/group/",
+                    items=[
+                        NavItem(
+                            title="Fake",
+                            url="fake-view",
+                            match="view_name",
+                            permissions=["is_authenticated"],
+                        ),
+                    ],
+                ),
+            ]
+        )
+
+        context = nav.get_context_data(view_name_req)
+
+        assert context["items"][0]["active"] is False
+
+    def test_get_active_override_not_indexed(self, view_name_req):
+        class NeverActiveNavItem(NavItem):
+            def get_active(self, request):
+                return False
+
+        nav = Nav(
+            items=[
+                NavGroup(
+                    title="Group",
+                    items=[
+                        NeverActiveNavItem(
+                            title="Fake", url="fake-view", match="view_name"
+                        )
+                    ],
+                ),
+            ]
+        )
+
+        context = nav.get_context_data(view_name_req)
+
+        assert context["items"][0]["active"] is False
+        assert nav.get_plan().matcher.decided.keys() == {id(nav.items[0])}
+
+    def test_exact_index(self, rf):
+        home = NavItem(title="Home", url="/")
+        search = NavItem(title="Search", url="/docs/?q=nav")
+        docs = NavGroup(title="Docs", url="/docs/", items=[search])
+        nav = Nav(items=[home, docs])
+
+        matcher = nav.get_plan().matcher
+
+        assert matcher.get_exact_table() == {
+            "": [(home, home._match_exact)],
+            "/docs": [(search, search._match_exact), (docs, docs._match_exact)],
+        }
+        assert matcher.closed == {id(home), id(docs), id(search)}
+
+        req = rf.get("/docs/", {"q": "nav"})
+        req.user = AnonymousUser()
+        nav.get_context_data(req)
+
+        # answered from the index, without comparing each item to the request
+        assert _matching.lookup(req, home) is False
+        assert _matching.lookup(req, search) is True
+        # still worked out by asking the children, which may be hidden
+        assert _matching.lookup(req, docs) is None
+
+    def test_prefix_and_regex_combined(self, rf):
+        docs = NavItem(title="Docs", url="/docs/", match="prefix")
+        intro = NavItem(title="Intro", url="/docs/intro/", match="prefix")
+        guides = NavItem(
+            title="Guides", url="/guides/", match="regex", pattern="/guides/"
+        )
+        any_page = NavItem(title="Pages", url="/", match="regex", pattern=r"/\w+/\w+/")
+        home = NavItem(title="Home", url="/")
+        nav = Nav(
+            items=[
+                NavGroup(title="Docs", items=[docs, intro]),
+                NavGroup(title="Guides", items=[guides, any_page]),
+                home,
+            ]
+        )
+
+        req = rf.get("/docs/intro/")
+        req.user = AnonymousUser()
+        context = nav.get_context_data(req)
+
+        docs_group, guides_group, home_context = context["items"]
+        assert docs_group["active"] is True
+        assert [item["active"] for item in docs_group["items"]] == [True, True]
+        assert guides_group["active"] is True
+        assert [item["active"] for item in guides_group["items"]] == [False, True]
+        assert home_context["active"] is False
+
+    def test_regex_conflicting_group_names(self, rf):
+        nav = Nav(
+            items=[
+                NavItem(title=..., url="/a/", match="regex", pattern="/(?P<x>a)/"),
+                NavItem(title=..., url="/b/", match="regex", pattern="/(?P<x>a|b)/"),
+            ]
+        )
+        matcher = nav.get_plan().matcher
+
+        req = rf.get("/a/")
+
+        assert matcher.get_combined_regex() is None
+        assert matcher.match(req)[0] == {id(item) for item in nav.items}
+
+    def test_regex_numbered_backreference(self, rf):
+        repeated = NavItem(title=..., url="/x/x/", match="regex", pattern=r"/(x)/\1/")
+        other = NavItem(title=..., url="/y/", match="regex", pattern=r"/(y)/")
+        nav = Nav(items=[repeated, other])
+        matcher = nav.get_plan().matcher
+
+        assert matcher.get_combined_regex() is not None
+        assert matcher.match(rf.get("/x/x/"))[0] == {id(repeated)}
+        assert matcher.match(rf.get("/x/y/"))[0] == set()
+        assert matcher.match(rf.get("/y/"))[0] == {id(other)}
+
+    def test_prefix_table_per_language(self):
+        nav = Nav(items=[NavItem(title=..., url="fake-view", match="prefix")])
+        matcher = nav.get_plan().matcher
+
+        with translation.override("en"):
+            assert matcher.get_prefix_table() == {"/fake-view": [nav.items[0]]}
+        with translation.override("fr"):
+            matcher.get_prefix_table()
+
+        assert len(matcher._prefix_tables) == 2
+
+
+class TestStaticVisibility:
+    """Tests for skipping permission checks when visibility can't vary."""
+
+    @pytest.fixture
+    def check_permissions_spy(self):
+        with patch.object(
+            NavItem,
+            "check_permissions",
+            autospec=True,
+            side_effect=NavItem.check_permissions,
+        ) as spy:
+            yield spy
+
+    def test_no_permissions(self, req, check_permissions_spy):
+        nav = Nav(
+            items=[
+                NavItem(title="Home", url="/"),
+                NavGroup(title="Group", items=[NavItem(title="Child", url="/child/")]),
+                NavGroup(title="Hollow", items=[]),
+            ]
+        )
+        req.user = AnonymousUser()
+
+        context = nav.get_context_data(req)
+
+        assert [item["title"] for item in context["items"]] == ["Home", "Group"]
+        assert nav.get_plan().hidden == {id(nav.items[2])}
+        check_permissions_spy.assert_not_called()
+
+    def test_superuser(self, req, check_permissions_spy):
+        req.user = baker.make(get_user_model(), is_superuser=True)
+
+        rendered_nav = DummyNav().render(req)
+
+        assert count_anchors(rendered_nav) == 19
+        check_permissions_spy.assert_not_called()
+
+    def test_not_superuser(self, req):
+        req.user = baker.make(get_user_model(), is_staff=True)
+
+        assert DummyNav().get_plan().has_static_visibility(req) is False
+
+    def test_check_permissions_override(self, req):
+        class HiddenNavItem(NavItem):
+            def check_permissions(self, request):
+                return False
+
+        nav = Nav(items=[HiddenNavItem(title="Hidden", url="/")])
+        req.user = AnonymousUser()
+
+        assert nav.get_plan().has_static_visibility(req) is False
+        assert nav.get_items(req) == []
+
+
+class TestPermissionMasks:
+    """Tests for checking permissions with the plan's permission bitmasks."""
+
+    def test_vocabulary(self):
+        def is_beta(request):
+            return True
+
+        nav = Nav(
+            items=[
+                NavItem(title=..., url="/a/", permissions=["is_staff", is_beta]),
+                NavItem(title=..., url="/b/", permissions=[is_beta, "tests.perm"]),
+                NavItem(title=..., url="/c/", permissions=["is_staff"]),
+            ]
+        )
+
+        plan = nav.get_plan()
+
+        assert plan.vocabulary == {"is_staff": 0, is_beta: 1, "tests.perm": 2}
+        assert [required for _, required, _, _ in plan.visibility] == [
+            0b011,
+            0b110,
+            0b001,
+        ]
+
+    def test_callable_checked_once_per_request(self, req):
+        calls = []
+
+        def is_beta(request):
+            calls.append(request)
+            return True
+
+        nav = Nav(
+            items=[
+                NavItem(title="A", url="/a/", permissions=[is_beta]),
+                NavGroup(
+                    title="Group",
+                    items=[NavItem(title="B", url="/b/", permissions=[is_beta])],
+                ),
+            ]
+        )
+        req.user = AnonymousUser()
+
+        context = nav.get_context_data(req)
+        nav.get_context_data(req)
+
+        assert [item["title"] for item in context["items"]] == ["A", "Group"]
+        assert len(context["items"][1]["items"]) == 1
+        assert calls == [req]
+
+    @pytest.mark.parametrize(
+        "user_kwargs,expected",
+        [
+            (None, ["Public"]),
+            ({}, ["Public", "Members"]),
+            ({"is_staff": True}, ["Public", "Members", "Staff"]),
+        ],
+    )
+    def test_hidden(self, user_kwargs, expected, req):
+        nav = Nav(
+            items=[
+                NavItem(title="Public", url="/"),
+                NavGroup(
+                    title="Members",
+                    items=[
+                        NavItem(
+                            title=..., url="/members/", permissions=["is_authenticated"]
+                        )
+                    ],
+                ),
+                NavGroup(
+                    title="Staff",
+                    permissions=["is_authenticated"],
+                    items=[NavItem(title=..., url="/staff/", permissions=["is_staff"])],
+                ),
+            ]
+        )
+        if user_kwargs is not None:
+            req.user = baker.make(get_user_model(), **user_kwargs)
+
+        items = nav.get_items(req)
+
+        assert [item.title for item in items] == expected
+        assert [item.check_permissions(req) for item in nav.items] == [
+            item in items for item in nav.items
+        ]
+
+    def test_hidden_by_role(self, req):
+        nav = Nav(
+            items=[
+                NavItem(title=..., url="/a/", permissions=["is_authenticated"]),
+                NavItem(title=..., url="/b/", permissions=["is_staff"]),
+            ]
+        )
+        plan = nav.get_plan()
+        req.user = baker.make(get_user_model(), is_staff=True)
+
+        assert set(plan.hidden_by_role) == {0b00, 0b01, 0b10, 0b11}
+        assert plan.hidden_by_role[0b01] == {id(nav.items[1])}
+        assert plan.get_hidden(req) is plan.hidden_by_role[0b11]
+
+    def test_hidden_by_role_not_used_with_other_permissions(self):
+        nav = Nav(
+            items=[
+                NavItem(title=..., url="/a/", permissions=["is_authenticated"]),
+                NavItem(title=..., url="/b/", permissions=["tests.dummy_perm"]),
+            ]
+        )
+
+        assert nav.get_plan().hidden_by_role == {}
+
+
+class TestRenderCache:
+    """Tests for caching the rendered nav with stale-while-revalidate refreshes."""
+
+    @pytest.fixture
+    def nav(self):
+        return Nav(
+            template_name="tests/dummy_nav.html",
+            items=[NavItem(title="Home", url="/")],
+            cache_key="main",
+            cache_timeout=60,
+            cache_stale_timeout=600,
+            cache_track_dependencies=False,
+        )
+
+    def test_constructor(self, nav):
+        assert nav.get_cache_key(None) == "main"
+        assert nav.get_cache_timeout(None) == 60
+        assert nav.get_cache_stale_timeout(None) == 600
+
+    def test_not_cached_by_default(self, req, locmem_cache):
+        nav = Nav(template_name="tests/dummy_nav.html", items=[])
+
+        nav.render(req)
+
+        with patch.object(Nav, "get_context_data", return_value={}) as ctx:
+            nav.render(req)
+            ctx.assert_called_once()
+
+    def test_cached(self, req, nav, locmem_cache):
+        rendered = nav.render(req)
+
+        with patch.object(Nav, "get_context_data") as ctx:
+            assert nav.render(req) == rendered
+            ctx.assert_not_called()
+
+        html, fresh_until = locmem_cache.get(
+            make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        )
+        assert html == rendered
+        assert fresh_until > time.time()
+
+    def test_cached_per_template_name(self, req, nav, locmem_cache):
+        nav.render(req)
+        nav.render(req, template_name="tests/alternate.html")
+
+        assert (
+            locmem_cache.get(
+                make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+            )
+            is not None
+        )
+        assert (
+            locmem_cache.get(
+                make_cache_key(
+                    "nav", nav.get_content_hash(), "main", "tests/alternate.html", None
+                )
+            )
+            is not None
+        )
+
+    def test_stale_served_and_refreshed(self, req, nav, locmem_cache):
+        key = make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        locmem_cache.set(key, ("stale", time.time() - 1))
+
+        assert nav.render(req) == "stale"
+
+        # wait for the refresh queued on the single background worker
+        get_refresh_executor().submit(lambda: None).result()
+
+        html, fresh_until = locmem_cache.get(key)
+        assert "Home" in html
+        assert fresh_until > time.time()
+        assert locmem_cache.get(f"{key}.lock") is None
+
+    def test_stale_refreshed_once(self, req, nav, locmem_cache):
+        key = make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        locmem_cache.set(key, ("stale", time.time() - 1))
+
+        with patch("django_simple_nav._cache.submit_refresh") as submit_refresh:
+            assert nav.render(req) == "stale"
+            assert nav.render(req) == "stale"
+
+        submit_refresh.assert_called_once()
+
+    def test_failed_refresh_releases_lock(self, req, nav, locmem_cache):
+        key = make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        locmem_cache.set(key, ("stale", time.time() - 1))
+
+        with patch.object(Nav, "get_context_data", side_effect=ValueError):
+            assert nav.render(req) == "stale"
+            get_refresh_executor().submit(lambda: None).result()
+
+        assert locmem_cache.get(key)[0] == "stale"
+        assert locmem_cache.get(f"{key}.lock") is None
+
+    def test_refresh_renders_request_snapshot(self, req, nav, locmem_cache):
+        req.user = baker.make(get_user_model())
+        key = make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        locmem_cache.set(key, ("stale", time.time() - 1))
+        requests = []
+        render = Nav._render
+
+        def record(self, request, *args):
+            requests.append(request)
+            return render(self, request, *args)
+
+        with patch.object(Nav, "_render", record):
+            assert nav.render(req) == "stale"
+            get_refresh_executor().submit(lambda: None).result()
+
+        (refreshed,) = requests
+        assert refreshed is not req
+        assert refreshed.path == req.path
+        assert refreshed.user == req.user
+
+    def test_cold_miss_waits_for_locked_render(self, req, nav, locmem_cache):
+        key = make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        locmem_cache.set(f"{key}.lock", True)
+
+        def rendered_elsewhere(seconds):
+            locmem_cache.set(key, ("rendered elsewhere", None))
+
+        with patch("django_simple_nav._cache.time.sleep", rendered_elsewhere):
+            assert nav.render(req) == "rendered elsewhere"
+
+    def test_cold_miss_lock_timeout(self, req, nav, locmem_cache):
+        key = make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        locmem_cache.set(f"{key}.lock", True)
+
+        with patch("django_simple_nav._cache.MISS_WAIT_TIMEOUT", 0):
+            assert "Home" in nav.render(req)
+
+        # the lock holder caches its own render
+        assert locmem_cache.get(key) is None
+
+    def test_no_stale_timeout(self, req, locmem_cache):
+        nav = Nav(
+            template_name="tests/dummy_nav.html",
+            items=[NavItem(title="Home", url="/")],
+            cache_key="main",
+            cache_track_dependencies=False,
+        )
+
+        rendered = nav.render(req)
+
+        assert locmem_cache.get(
+            make_cache_key("nav", nav.get_content_hash(), "main", None, None)
+        ) == (
+            rendered,
+            None,
+        )
+
+
+class TestActiveSplicing:
+    """Tests for filling in the active state of cached, path-independent nav HTML."""
+
+    @pytest.fixture
+    def nav(self):
+        return Nav(
+            template_name="tests/self_render_nav.html",
+            items=[
+                NavItem(title="Home", url="/"),
+                NavGroup(
+                    title="Docs",
+                    url="/docs/",
+                    items=[
+                        NavItem(title="Intro", url="/docs/intro/"),
+                        NavItem(
+                            title="Staff", url="/docs/staff/", permissions=["is_staff"]
+                        ),
+                    ],
+                ),
+            ],
+            cache_key="main",
+            cache_splice_active=True,
+        )
+
+    @pytest.mark.parametrize("path", ["/", "/docs/", "/docs/intro/", "/other/"])
+    def test_same_as_uncached(self, rf, nav, path, locmem_cache):
+        uncached = Nav(template_name=nav.template_name, items=nav.items)
+
+        for _ in range(2):
+            req = rf.get(path)
+            req.user = AnonymousUser()
+
+            assert nav.render(req) == uncached.render(req)
+
+    def test_cached_across_paths(self, rf, nav, locmem_cache):
+        req = rf.get("/")
+        req.user = AnonymousUser()
+        nav.render(req)
+
+        req = rf.get("/docs/intro/")
+        req.user = AnonymousUser()
+        with patch("django_simple_nav.nav.render_to_string") as render_to_string:
+            rendered = nav.render(req)
+            render_to_string.assert_not_called()
+
+        assert rendered.count('aria-current="page"') == 2
+        assert 'href="/docs/intro/" aria-current="page"' in rendered
+        assert 'href="/docs/" aria-current="page"' in rendered
+
+    def test_cached_per_permissions(self, rf, nav, locmem_cache):
+        req = rf.get("/")
+        req.user = AnonymousUser()
+        assert "Staff" not in nav.render(req)
+
+        req = rf.get("/")
+        req.user = baker.make(get_user_model(), is_staff=True)
+        assert "Staff" in nav.render(req)
+
+    def test_unspliceable_recorded_once(self, rf, locmem_cache):
+        class ActiveNav(Nav):
+            items = [
+                NavItem(title="Home", url="/"),
+                NavItem(title="About", url="/about/"),
+            ]
+            cache_key = "main"
+            cache_splice_active = True
+
+            def get_template(self, template_name=None):
+                return (
+                    "{% for item in items %}"
+                    "{% if item.active %}*{% endif %}{{ item.title }}"
+                    "{% endfor %}"
+                )
+
+        assert ActiveNav().render(rf.get("/")) == "*HomeAbout"
+        with patch("django_simple_nav._splice.record") as record:
+            assert ActiveNav().render(rf.get("/about/")) == "Home*About"
+            record.assert_not_called()
+
+    def test_accordion_not_recorded(self, rf, nav, locmem_cache):
+        nav = Nav(
+            template_name=nav.template_name,
+            items=nav.items,
+            cache_key="main",
+            cache_splice_active=True,
+            accordion=True,
+        )
+        req = rf.get("/docs/intro/")
+        req.user = AnonymousUser()
+
+        with patch("django_simple_nav._splice.record") as record:
+            rendered = nav.render(req)
+            record.assert_not_called()
+
+        assert "Intro" in rendered
+        assert not locmem_cache._cache
+
+
+class TestClientActive:
+    """Tests for leaving the active state of items to the browser."""
+
+    @pytest.fixture
+    def nav(self):
+        return Nav(
+            template_name="tests/self_render_nav.html",
+            items=[
+                NavItem(title="Home", url="/"),
+                NavGroup(
+                    title="Docs",
+                    url="/docs/",
+                    match="prefix",
+                    items=[NavItem(title="Search", url="/docs/?q=nav")],
+                ),
+                NavItem(
+                    title="Blog", url="/blog/", match="regex", pattern=r"/blog/\d+/"
+                ),
+            ],
+            client_active=True,
+        )
+
+    def test_render(self, rf, nav):
+        rendered = nav.render(rf.get("/"))
+
+        assert 'aria-current="page"' not in rendered.split("<script>")[0]
+        assert '<a href="/" data-nav-path="/">' in rendered
+        assert 'data-nav-path="/docs/" data-nav-match="prefix"' in rendered
+        assert 'data-nav-path="/docs/?q=nav"' in rendered
+        assert 'data-nav-path="/blog/\\d+/" data-nav-match="regex"' in rendered
+        assert rendered.endswith("</script>")
+
+    def test_same_for_every_path(self, rf, nav):
+        assert nav.render(rf.get("/")) == nav.render(rf.get("/docs/"))
+
+    def test_get_active_not_called(self, rf, nav):
+        with (
+            patch.object(NavItem, "get_active") as item_get_active,
+            patch.object(NavGroup, "get_active") as group_get_active,
+        ):
+            nav.render(rf.get("/"))
+
+        item_get_active.assert_not_called()
+        group_get_active.assert_not_called()
+
+    @pytest.mark.parametrize("path", ["/", "/docs/", "/docs/?q=nav", "/blog/1/"])
+    def test_spliced(self, rf, nav, path, locmem_cache):
+        spliced = Nav(
+            template_name=nav.template_name,
+            items=nav.items,
+            client_active=True,
+            cache_key="main",
+            cache_splice_active=True,
+        )
+
+        for _ in range(2):
+            req = rf.get(path)
+            req.user = AnonymousUser()
+
+            assert spliced.render(req) == nav.render(req)
+
+    def test_no_script(self, rf, nav):
+        nav = Nav(
+            template_name=nav.template_name,
+            items=nav.items,
+            client_active=True,
+            client_active_script=False,
+        )
+
+        assert "<script>" not in nav.render(rf.get("/"))
+
+    def test_view_name_matches_path(self, rf):
+        nav = Nav(
+            template_name="tests/self_render_nav.html",
+            items=[NavItem(title="Fake", url="fake-view", match="view_name")],
+            client_active=True,
+        )
+
+        assert 'data-nav-path="/fake-view/"' in nav.render(rf.get("/"))
+
+    def test_not_client_active_by_default(self, rf, nav):
+        nav = Nav(template_name=nav.template_name, items=nav.items)
+
+        rendered = nav.render(rf.get("/"))
+
+        assert "data-nav-path" not in rendered
+        assert "<script>" not in rendered
+        assert 'aria-current="page"' in rendered
+
+
+class TestAccordion:
+    """Tests for only expanding the groups on the active branch."""
+
+    @pytest.fixture
+    def nav(self):
+        return Nav(
+            template_name="tests/self_render_nav.html",
+            items=[
+                NavItem(title="Home", url="/"),
+                NavGroup(
+                    title="Docs",
+                    url="/docs/",
+                    items=[
+                        NavGroup(
+                            title="Guides",
+                            items=[NavItem(title="Intro", url="/docs/intro/")],
+                        ),
+                        NavGroup(
+                            title="API",
+                            items=[NavItem(title="Nav", url="/docs/nav/")],
+                        ),
+                    ],
+                ),
+                NavGroup(
+                    title="Blog",
+                    items=[NavItem(title="Latest", url="/blog/")],
+                ),
+            ],
+            accordion=True,
+        )
+
+    def test_only_active_branch_expanded(self, rf, nav):
+        req = rf.get("/docs/intro/")
+        req.user = AnonymousUser()
+
+        context = nav.get_context_data(req)
+
+        home, docs, blog = context["items"]
+        assert home["items"] is None
+        assert blog["active"] is False
+        assert blog["items"] == []
+        guides, api = docs["items"]
+        assert guides["active"] is True
+        assert [item["title"] for item in guides["items"]] == ["Intro"]
+        assert api["items"] == []
+
+    def test_collapsed_children_not_built(self, rf, nav):
+        req = rf.get("/")
+        req.user = AnonymousUser()
+
+        with patch.object(
+            NavGroup, "get_items", autospec=True, side_effect=NavGroup.get_items
+        ) as get_items:
+            rendered = nav.render(req)
+
+        assert "Docs" in rendered
+        assert "Guides" not in rendered
+        assert "Latest" not in rendered
+        # each group only works out its own visibility, not its children
+        get_items.assert_not_called()
+
+    def test_active_group_expanded(self, rf, nav):
+        req = rf.get("/docs/")
+        req.user = AnonymousUser()
+
+        rendered = nav.render(req)
+
+        assert "Guides" in rendered
+        assert "Intro" not in rendered
+
+    def test_ignored_with_client_active(self, rf, nav):
+        nav = Nav(
+            template_name=nav.template_name,
+            items=nav.items,
+            accordion=True,
+            client_active=True,
+        )
+
+        assert "Latest" in nav.render(rf.get("/"))
+
+    def test_not_accordion_by_default(self, rf, nav):
+        nav = Nav(template_name=nav.template_name, items=nav.items)
+        req = rf.get("/")
+        req.user = AnonymousUser()
+
+        assert "Latest" in nav.render(req)
+
+
+class TestMaxDepth:
+    """Tests for only building the first few levels of a nav."""
+
+    @pytest.fixture
+    def nav(self):
+        return Nav(
+            template_name="tests/self_render_nav.html",
+            items=[
+                NavGroup(
+                    title="Docs",
+                    url="/docs/",
+                    items=[
+                        NavGroup(
+                            title="Guides",
+                            items=[NavItem(title="Intro", url="/docs/intro/")],
+                        ),
+                    ],
+                ),
+            ],
+        )
+
+    @pytest.fixture
+    def req(self, rf):
+        req = rf.get("/docs/intro/")
+        req.user = AnonymousUser()
+        return req
+
+    def test_get_context_data(self, req, nav):
+        context = nav.get_context_data(req, max_depth=2)
+
+        (docs,) = context["items"]
+        (guides,) = docs["items"]
+        assert guides["items"] == []
+        # the active state still comes from the whole tree
+        assert guides["active"] is True
+
+    def test_render(self, req, nav):
+        assert "Guides" not in nav.render(req, max_depth=1)
+        assert "Intro" not in nav.render(req, max_depth=2)
+        assert "Intro" in nav.render(req)
+
+    def test_invalid(self, req, nav):
+        with pytest.raises(ValueError, match="max_depth"):
+            nav.get_context_data(req, max_depth=0)
+
+    def test_cache_varies_on_max_depth(self, req, nav, locmem_cache):
+        nav = Nav(template_name=nav.template_name, items=nav.items, cache_key="main")
+
+        assert "Guides" not in nav.render(req, max_depth=1)
+        assert "Guides" in nav.render(req)
+
+    def test_get_context_data_override(self, req):
+        class OverrideNav(DummyNav):
+            def get_context_data(self, request):
+                return {"items": []}
+
+        assert count_anchors(OverrideNav().render(req)) == 0
+
+
+class TestContentHash:
+    """Tests for versioning cached HTML by the nav's definition."""
+
+    def test_same_definition(self):
+        def make_nav():
+            return Nav(
+                template_name="tests/dummy_nav.html",
+                items=[
+                    NavGroup(
+                        title="Docs",
+                        url=reverse_lazy("fake-view"),
+                        items=[NavItem(title="Intro", url=lambda: "/intro/")],
+                    )
+                ],
+            )
+
+        assert make_nav().get_content_hash() == make_nav().get_content_hash()
+
+    @pytest.mark.parametrize(
+        "changed",
+        [
+            {"items": [NavItem(title="Home", url="/home/")]},
+            {"items": [NavItem(title="Start", url="/")]},
+            {"items": [NavItem(title="Home", url="/", permissions=["is_staff"])]},
+            {"items": [NavItem(title="Home", url="/", template_name="item.html")]},
+            {"template_name": "tests/alternate.html"},
+            {"accordion": True},
+        ],
+    )
+    def test_changed_definition(self, changed):
+        options = {
+            "template_name": "tests/dummy_nav.html",
+            "items": [NavItem(title="Home", url="/")],
+        }
+
+        assert (
+            Nav(**options).get_content_hash()
+            != Nav(**{**options, **changed}).get_content_hash()
+        )
+
+    def test_changed_lambda(self):
+        def make_nav(check):
+            return Nav(
+                template_name="tests/dummy_nav.html",
+                items=[NavItem(title="Home", url="/", permissions=[check])],
+            )
+
+        assert (
+            make_nav(lambda request: request.user.is_staff).get_content_hash()
+            != make_nav(lambda request: request.user.is_superuser).get_content_hash()
+        )
+
+    def test_deploy_misses_cache(self, req, locmem_cache):
+        before = Nav(
+            template_name="tests/dummy_nav.html",
+            items=[NavItem(title="Before", url="/")],
+            cache_key="main",
+        )
+        after = Nav(
+            template_name="tests/dummy_nav.html",
+            items=[NavItem(title="After", url="/")],
+            cache_key="main",
+        )
+
+        assert "Before" in before.render(req)
+        assert "After" in after.render(req)
+
+    def test_template_tag_identity(self):
+        assert (
+            get_nav_identity("tests.navs.DummyNav")
+            == f"tests.navs.DummyNav:{DummyNav().get_content_hash()}"
+        )
+
+    def test_template_tag_identity_of_instance(self, monkeypatch):
+        def identity(title):
+            nav = Nav(
+                template_name="tests/dummy_nav.html",
+                items=[NavItem(title=title, url="/")],
+            )
+            monkeypatch.setattr("tests.navs.instance_nav", nav, raising=False)
+            return get_nav_identity("tests.navs.instance_nav")
+
+        before = identity("Before")
+
+        assert before.startswith("tests.navs.instance_nav:")
+        assert identity("After") != before
+
+    def test_template_tag_identity_computed_once(self):
+        get_nav_identity("tests.navs.DummyNav")
+
+        with patch.object(DummyNav, "get_content_hash") as get_content_hash:
+            get_nav_identity("tests.navs.DummyNav")
+            get_content_hash.assert_not_called()
+
+
+class TestSharedSubtrees:
+    """Tests for sharing the work on items that are part of several navs."""
+
+    @pytest.fixture
+    def account(self):
+        return NavGroup(
+            title="Account",
+            url="/account/",
+            items=[
+                NavItem(title="Profile", url="/profile/"),
+                NavItem(title="Settings", url="/settings/"),
+            ],
+        )
+
+    def test_evaluated_once_per_request(self, rf, account):
+        navs = [
+            Nav(
+                template_name="tests/dummy_nav.html",
+                items=[NavItem(title=title, url=f"/{title}/"), account],
+            )
+            for title in ("header", "sidebar", "mobile")
+        ]
+        request = rf.get("/profile/")
+
+        with patch.object(NavItem, "get_title", autospec=True) as get_title:
+            get_title.side_effect = lambda item: item.title
+            rendered = [nav.render(request) for nav in navs]
+
+        calls = [call.args[0].title for call in get_title.call_args_list]
+        assert calls.count("Account") == 1
+        assert calls.count("Profile") == 1
+        assert calls.count("Settings") == 1
+        assert all("Settings" in html for html in rendered)
+
+    def test_evaluated_again_for_another_request(self, rf, account):
+        nav = Nav(template_name="tests/dummy_nav.html", items=[account])
+
+        with patch.object(NavItem, "get_title", autospec=True) as get_title:
+            get_title.side_effect = lambda item: item.title
+            nav.render(rf.get("/"))
+            nav.render(rf.get("/"))
+
+        calls = [call.args[0].title for call in get_title.call_args_list]
+        assert calls.count("Account") == 2
+
+    def test_copied_for_each_caller(self, req, account):
+        first = account.get_context_data(req)
+        first["title"] = "Changed"
+
+        assert account.get_context_data(req)["title"] == "Account"
+
+    def test_items_copied_for_each_caller(self, req, account):
+        first = account.get_context_data(req)
+        first["items"].append(NavItem(title="Logout", url="/logout/"))
+
+        second = account.get_context_data(req)
+
+        assert len(second["items"]) == 2
+        assert second["items"][0] is first["items"][0]
+
+    def test_client_active_evaluated_separately(self, rf, account):
+        request = rf.get("/account/")
+        server = Nav(template_name="tests/self_render_nav.html", items=[account])
+        client = Nav(
+            template_name="tests/self_render_nav.html",
+            items=[account],
+            client_active=True,
+        )
+
+        assert 'aria-current="page"' in server.render(request)
+        assert "data-nav-path" in client.render(request)
+        assert 'aria-current="page"' in server.render(request)
+
+    def test_plan_shared(self, account):
+        items = [NavItem(title="Home", url="/"), account]
+
+        class HeaderNav(Nav):
+            template_name = "tests/dummy_nav.html"
+
+        HeaderNav.items = items
+
+        class MobileNav(HeaderNav):
+            template_name = "tests/alternate.html"
+
+        assert HeaderNav().get_plan() is MobileNav().get_plan()
+        assert Nav(items=items).get_plan() is HeaderNav().get_plan()
+        assert Nav(items=list(items)).get_plan() is HeaderNav().get_plan()
+
+    def test_plan_not_shared_with_other_items(self, account):
+        plan = Nav(items=[account]).get_plan()
+        other = Nav(items=[NavGroup(title="Account", url="/account/")]).get_plan()
+
+        assert plan is not other
+
+
+class TestRenderNavs:
+    """Tests for rendering several navs in one call."""
+
+    def test_in_order(self, req):
+        navs = [
+            Nav(
+                template_name="tests/dummy_nav.html",
+                items=[NavItem(title=title, url=f"/{title}/")],
+            )
+            for title in ("header", "sidebar", "footer")
+        ]
+
+        rendered = render_navs(req, navs)
+
+        assert rendered == [nav.render(req) for nav in navs]
+        assert [html.count("<a") for html in rendered] == [1, 1, 1]
+        assert "header" in rendered[0]
+        assert "footer" in rendered[2]
+
+    def test_permission_checked_once(self, rf):
+        checks = []
+
+        def is_beta(request):
+            checks.append(request)
+            return True
+
+        navs = [
+            Nav(
+                template_name="tests/dummy_nav.html",
+                items=[NavItem(title=title, url=f"/{title}/", permissions=[is_beta])],
+            )
+            for title in ("header", "sidebar")
+        ]
+        request = rf.get("/")
+        request.user = baker.make(get_user_model())
+
+        rendered = render_navs(request, navs)
+
+        assert all("<a" in html for html in rendered)
+        assert len(checks) == 1
+
+
+class TestEvaluate:
+    """Tests for evaluating a nav once for both HTML and JSON."""
+
+    @pytest.fixture
+    def nav(self):
+        return Nav(
+            template_name="tests/dummy_nav.html",
+            items=[
+                NavItem(title="Home", url="/", extra_context={"tags": ["a", "b"]}),
+                NavGroup(
+                    title="Docs",
+                    url=reverse_lazy("fake-view"),
+                    items=[NavItem(title="Intro", url="/intro/")],
+                ),
+            ],
+        )
+
+    def test_render(self, rf, nav):
+        request = rf.get("/")
+
+        assert nav.evaluate(request).render() == nav.render(request)
+
+    def test_render_template_name(self, rf, nav):
+        rendered = nav.evaluate(rf.get("/")).render("tests/alternate.html")
+
+        assert "This is an alternate template." in rendered
+
+    def test_to_json(self, rf, nav):
+        data = json.loads(nav.evaluate(rf.get("/intro/")).to_json())
+
+        assert data == {
+            "items": [
+                {
+                    "title": "Home",
+                    "url": "/",
+                    "active": False,
+                    "items": None,
+                    "tags": ["a", "b"],
+                },
+                {
+                    "title": "Docs",
+                    "url": "/fake-view/",
+                    "active": True,
+                    "items": [
+                        {
+                            "title": "Intro",
+                            "url": "/intro/",
+                            "active": True,
+                            "items": None,
+                        }
+                    ],
+                },
+            ]
+        }
+
+    def test_to_json_kwargs(self, rf, nav):
+        assert "\n" in nav.evaluate(rf.get("/")).to_json(indent=2)
+
+    def test_evaluated_once(self, rf, nav):
+        with patch.object(
+            Nav, "get_context_data", autospec=True, side_effect=Nav.get_context_data
+        ) as get_context_data:
+            evaluated = nav.evaluate(rf.get("/"))
+            html = evaluated.render()
+            data = evaluated.to_data()
+
+        get_context_data.assert_called_once()
+        assert html.count("<a") == 3
+        assert [item["title"] for item in data["items"]] == ["Home", "Docs"]
+
+    def test_max_depth(self, rf, nav):
+        data = nav.evaluate(rf.get("/"), max_depth=1).to_data()
+
+        assert data["items"][1]["items"] == []
+
+    def test_client_active(self, rf, nav):
+        client_nav = Nav(
+            template_name="tests/dummy_nav.html", items=nav.items, client_active=True
+        )
+        evaluated = client_nav.evaluate(rf.get("/"))
+
+        assert evaluated.render().endswith("</script>")
+        assert evaluated.to_data()["items"][0]["nav_path"] == "/"
+
+
+class TestDependencyTracking:
+    """Tests for building cache keys from what a nav reads from the request."""
+
+    @pytest.fixture
+    def items(self):
+        return [
+            NavItem(title="Home", url="/"),
+            NavItem(title="Staff", url="/staff/", permissions=["is_staff"]),
+        ]
+
+    def render(self, nav, rf, path="/", user=None, **extra):
+        req = rf.get(path, **extra)
+        req.user = user or AnonymousUser()
+        return req, nav.render(req)
+
+    def test_keyed_on_permissions_not_user(self, rf, items, locmem_cache):
+        nav = Nav(
+            template_name="tests/self_render_nav.html", items=items, cache_key="main"
+        )
+        User = get_user_model()
+
+        req, rendered = self.render(nav, rf, user=baker.make(User))
+
+        assert _dependencies.get_remembered(req) == {"path", "permissions", "query"}
+        with patch.object(Nav, "get_context_data") as get_context_data:
+            assert self.render(nav, rf, user=baker.make(User))[1] == rendered
+            get_context_data.assert_not_called()
+
+        assert "Staff" in self.render(nav, rf, user=baker.make(User, is_staff=True))[1]
+
+    def test_keyed_on_path(self, rf, items, locmem_cache):
+        nav = Nav(
+            template_name="tests/self_render_nav.html", items=items, cache_key="main"
+        )
+
+        _, home = self.render(nav, rf, "/")
+        _, other = self.render(nav, rf, "/other/")
+
+        assert 'href="/" aria-current="page"' in home
+        assert 'aria-current="page"' not in other
+        assert self.render(nav, rf, "/")[1] == home
+
+    def test_learns_new_dependencies(self, rf, locmem_cache):
+        def is_beta(request):
+            return request.user.is_staff and request.GET.get("beta") == "1"
+
+        nav = Nav(
+            template_name="tests/self_render_nav.html",
+            items=[NavItem(title="Beta", url="/beta/", permissions=[is_beta])],
+            cache_key="main",
+            cache_track_dependencies=True,
+        )
+        User = get_user_model()
+        staff = baker.make(User, is_staff=True)
+
+        assert "Beta" not in self.render(nav, rf, user=AnonymousUser())[1]
+        assert "Beta" not in self.render(nav, rf, user=staff)[1]
+        assert "Beta" in self.render(nav, rf, user=staff, data={"beta": "1"})[1]
+
+    def test_custom_check_permissions_keyed_on_user(self, rf, locmem_cache):
+        class UserNavItem(NavItem):
+            def check_permissions(self, request):
+                return request.user.username == "plainview"
+
+        nav = Nav(
+            template_name="tests/self_render_nav.html",
+            items=[UserNavItem(title="Milkshake", url="/milkshake/")],
+            cache_key="main",
+        )
+        User = get_user_model()
+
+        req, _ = self.render(nav, rf, user=baker.make(User, username="eli"))
+        rendered = self.render(nav, rf, user=baker.make(User, username="plainview"))[1]
+
+        assert "user" in _dependencies.get_remembered(req)
+        assert "Milkshake" in rendered
+
+    @pytest.fixture
+    def context_processors(self, settings):
+        # the context processors of a new project
+        settings.TEMPLATES = [
+            {
+                **settings.TEMPLATES[0],
+                "OPTIONS": {
+                    "context_processors": [
+                        "django.template.context_processors.debug",
+                        "django.template.context_processors.request",
+                        "django.contrib.auth.context_processors.auth",
+                        "django.contrib.messages.context_processors.messages",
+                    ]
+                },
+            }
+        ]
+
+    @pytest.mark.usefixtures("context_processors")
+    def test_default_context_processors(self, rf, items, locmem_cache):
+        class URLNav(Nav):
+            def get_template(self, template_name=None):
+                return "{% for item in items %}{{ item }}{% endfor %}{% url 'home' %}"
+
+        nav = URLNav(template_name=None, items=items, cache_key="main")
+        User = get_user_model()
+
+        req, rendered = self.render(nav, rf, user=baker.make(User))
+
+        assert _dependencies.get_remembered(req) == {"path", "permissions", "query"}
+        with patch.object(Nav, "get_context_data") as get_context_data:
+            assert self.render(nav, rf, user=baker.make(User))[1] == rendered
+            get_context_data.assert_not_called()
+
+    @pytest.mark.usefixtures("context_processors")
+    def test_user_read_by_template(self, rf, locmem_cache):
+        class UserNav(Nav):
+            def get_template(self, template_name=None):
+                return "{{ request.user.username }}"
+
+        nav = UserNav(template_name=None, items=[], cache_key="main")
+        User = get_user_model()
+
+        req, rendered = self.render(nav, rf, user=baker.make(User, username="eli"))
+
+        assert rendered == "eli"
+        assert "user" in _dependencies.get_remembered(req)
+        assert self.render(nav, rf, user=baker.make(User, username="paul"))[1] == "paul"
+
+    def test_csrf_token(self, rf, locmem_cache):
+        class LogoutNav(Nav):
+            def get_template(self, template_name=None):
+                return "<form>{% csrf_token %}</form>"
+
+        nav = LogoutNav(template_name=None, items=[], cache_key="main")
+
+        for _ in range(2):
+            req = rf.get("/")
+            req.user = AnonymousUser()
+            req.META["CSRF_COOKIE"] = "a" * 32
+
+            assert "csrfmiddlewaretoken" in nav.render(req)
+            assert req.META["CSRF_COOKIE_NEEDS_UPDATE"]
+            assert _dependencies.UNCACHEABLE in _dependencies.get_remembered(req)
+
+    def test_uncacheable(self, rf, locmem_cache):
+        nav = Nav(
+            template_name="tests/self_render_nav.html",
+            items=[NavItem(title="Tenant", url="/", permissions=[lambda r: r.tenant])],
+            cache_key="main",
+        )
+
+        req = rf.get("/")
+        req.user = baker.make(get_user_model())
+        req.tenant = True
+        assert "Tenant" in nav.render(req)
+
+        req = rf.get("/")
+        req.user = baker.make(get_user_model())
+        req.tenant = False
+        assert "Tenant" not in nav.render(req)
+
+    def test_vary_headers(self):
+        assert _dependencies.get_vary_headers(
+            {
+                "path",
+                "query",
+                "permissions",
+                "session:cart",
+                "meta:HTTP_ACCEPT_LANGUAGE",
+            }
+        ) == ["Accept-Language", "Cookie"]
+
+    def test_vary_middleware(self, rf, items, locmem_cache):
+        nav = Nav(
+            template_name="tests/self_render_nav.html", items=items, cache_key="main"
+        )
+
+        def view(request):
+            return HttpResponse(nav.render(request))
+
+        req = rf.get("/")
+        req.user = AnonymousUser()
+        response = NavVaryMiddleware(view)(req)
+
+        assert response["Vary"] == "Cookie"
@@ -156,6 +156,29 @@ def test_get_items_override(req):
     assert items[1].url == "/test2/overridden/"
 
 
+def test_get_items_generator(req):
+    class GeneratorNavGroup(NavGroup):
+        def get_items(self, request):
+            for item in self.items:
+                if item.check_permissions(request):
+                    yield item
+
+    group = GeneratorNavGroup(
+        title=...,
+        items=[
+            NavItem(title="Public", url="/test/"),
+            NavItem(title="Staff", url="/test/", permissions=["is_staff"]),
+            NavItem(title="Other", url="/other/"),
+        ],
+    )
+    req.path = "/other/"
+
+    context = group.get_context_data(req)
+
+    assert group.get_active(req) is True
+    assert [item["title"] for item in context["items"]] == ["Public", "Other"]
+
+
 @pytest.mark.parametrize(
     "url,append_slash,expected",
     [
@@ -335,3 +358,25 @@ def test_items_check_permissions_is_authenticated(url, items, expected, req):
     req.user = baker.make(get_user_model())
 
     assert group.check_permissions(req) is expected
+
+
+def test_items_stored_as_tuple():
+    child = NavItem(title="Child", url="/child/")
+
+    group = NavGroup(title="Group", items=[child])
+
+    assert group.items == (child,)
+
+
+def test_hashable():
+    def make_group():
+        return NavGroup(
+            title="Account",
+            items=[NavItem(title="Profile", url="/profile/", permissions=["is_staff"])],
+        )
+
+    group = make_group()
+
+    assert hash(group) == hash(make_group())
+    assert group.__dict__["_hash"] == hash(group)
+    assert len({group, make_group()}) == 1
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import copy
+import pickle
+
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import DisallowedHost
 from django.core.exceptions import ImproperlyConfigured
 from django.test import override_settings
+from django.urls import resolve
 from django.urls import reverse
 from django.urls import reverse_lazy
 from model_bakery import baker
 
+from django_simple_nav import _matching
+from django_simple_nav.nav import Nav
 from django_simple_nav.nav import NavItem
 
 pytestmark = pytest.mark.django_db
@@ -180,6 +187,37 @@ def test_active(url, req_path, req_params, expected, rf):
     assert item.get_active(req) == expected
 
 
+@pytest.mark.parametrize(
+    "url,query_string,expected",
+    [
+        ("/test/?a=1&a=2", "a=1&a=2", True),
+        ("/test/?a=1&a=2", "a=1", False),
+        ("/test/?a=1", "a=1&b=", True),
+        ("/test/", "b=", True),
+        ("/test/?b=", "", True),
+        ("/test/?a=1&b=2", "b=2&a=1", True),
+    ],
+)
+def test_active_query_params(url, query_string, expected, rf):
+    item = NavItem(title=..., url=url)
+
+    req = rf.get(f"/test/?{query_string}")
+
+    assert item.get_active(req) is expected
+
+
+def test_active_query_params_parsed_once_per_request(rf):
+    items = [
+        NavItem(title=..., url="/test/?query=param"),
+        NavItem(title=..., url="/other/?query=param"),
+    ]
+
+    req = rf.get("/test/", {"query": "param"})
+
+    assert [item.get_active(req) for item in items] == [True, False]
+    assert req._django_simple_nav_query == {"query": ["param"]}
+
+
 def test_active_different_scheme(rf):
     item = NavItem(title=..., url="https://testserver/")
 
@@ -204,6 +242,33 @@ def test_active_no_scheme_no_netloc(rf):
     assert item.get_active(req) is True
 
 
+@override_settings(ALLOWED_HOSTS=["allowed"])
+def test_active_relative_url_skips_host_validation(rf):
+    item = NavItem(title=..., url="/test/")
+
+    req = rf.get("/test/", HTTP_HOST="disallowed")
+
+    assert item.get_active(req) is True
+
+
+@override_settings(ALLOWED_HOSTS=["allowed"])
+def test_active_absolute_url_validates_host(rf):
+    item = NavItem(title=..., url="http://allowed/test/")
+
+    req = rf.get("/test/", HTTP_HOST="disallowed")
+
+    with pytest.raises(DisallowedHost):
+        item.get_active(req)
+
+
+def test_active_non_ascii_path(rf):
+    item = NavItem(title=..., url="/caf%C3%A9/")
+
+    req = rf.get("/café/")
+
+    assert item.get_active(req) is True
+
+
 @pytest.mark.parametrize("append_slash", [True, False])
 def test_active_append_slash_setting(append_slash, rf):
     item = NavItem(title=..., url="http://testserver/test")
@@ -230,6 +295,117 @@ def test_active_reverse_no_match(req):
     assert item.get_active(req) is False
 
 
+@pytest.mark.parametrize(
+    "url,req_path,expected",
+    [
+        ("fake-view", "/fake-view/", True),
+        ("fake-view", "/fake-view/1/", False),
+        ("fake-view-detail", "/fake-view/1/", False),
+        ("home", "/fake-view/", False),
+    ],
+)
+def test_active_view_name(url, req_path, expected, rf):
+    item = NavItem(title=..., url=url, match="view_name")
+
+    req = rf.get(req_path)
+    req.resolver_match = resolve(req_path)
+
+    assert item.get_active(req) is expected
+
+
+def test_active_view_name_ignores_query_params(rf):
+    item = NavItem(title=..., url="fake-view", match="view_name")
+
+    req = rf.get("/fake-view/", {"page": "2"})
+    req.resolver_match = resolve("/fake-view/")
+
+    assert item.get_active(req) is True
+
+
+def test_active_view_name_no_resolver_match(rf):
+    item = NavItem(title=..., url="fake-view", match="view_name")
+
+    req = rf.get("/fake-view/")
+
+    assert item.get_active(req) is False
+
+
+@pytest.mark.parametrize(
+    "url,pattern,req_path,expected",
+    [
+        ("/docs/", None, "/docs/", True),
+        ("/docs/", None, "/docs", True),
+        ("/docs/", None, "/docs/intro/", True),
+        ("/docs/", None, "/docs-old/", False),
+        ("/docs/intro/", "/docs/", "/docs/reference/", True),
+        ("/", None, "/anything/", True),
+        (reverse_lazy("fake-view"), None, "/fake-view/1/", True),
+    ],
+)
+def test_active_prefix(url, pattern, req_path, expected, rf):
+    item = NavItem(title=..., url=url, match="prefix", pattern=pattern)
+
+    req = rf.get(req_path)
+
+    assert item.get_active(req) is expected
+
+
+@pytest.mark.parametrize(
+    "pattern,req_path,expected",
+    [
+        (r"/docs/", "/docs/intro/", True),
+        (r"/docs/$", "/docs/intro/", False),
+        (r"/(docs|guides)/", "/guides/intro/", True),
+        (r"/docs/", "/other/docs/", False),
+    ],
+)
+def test_active_regex(pattern, req_path, expected, rf):
+    item = NavItem(title=..., url="/docs/", match="regex", pattern=pattern)
+
+    req = rf.get(req_path)
+
+    assert item.get_active(req) is expected
+
+
+def test_active_prefix_percent_encoded(rf):
+    # a reversed URL is percent-encoded, while `request.path` is not
+    item = NavItem(title=..., url="/caf%C3%A9/", match="prefix")
+    nav = Nav(template_name="tests/dummy_nav.html", items=[item])
+    req = rf.get("/caf%C3%A9/menu/")
+
+    assert item.get_active(req) is True
+
+    nav.render(req)
+    assert _matching.lookup(req, item) is True
+
+
+def test_match_prefix_requires_url_or_pattern():
+    with pytest.raises(ImproperlyConfigured):
+        NavItem(title=..., match="prefix")
+
+    NavItem(title=..., match="prefix", pattern="/docs/")
+
+
+def test_match_regex_requires_pattern():
+    with pytest.raises(ImproperlyConfigured):
+        NavItem(title=..., url="/docs/", match="regex")
+
+
+def test_match_regex_invalid_pattern():
+    with pytest.raises(ImproperlyConfigured):
+        NavItem(title=..., url="/docs/", match="regex", pattern="(")
+
+
+def test_match_view_name_requires_url_name():
+    with pytest.raises(ImproperlyConfigured):
+        NavItem(title=..., url=reverse_lazy("fake-view"), match="view_name")
+
+
+def test_match_unknown_strategy():
+    with pytest.raises(ImproperlyConfigured):
+        NavItem(title=..., url="/test/", match="fuzzy")
+
+
 def test_get_items(req):
     item = NavItem(title=..., url=...)
 
@@ -364,7 +540,18 @@ def test_check_permissions_no_contrib_auth(permissions, expected, req, caplog):
     with caplog.at_level("WARNING"):
         assert item.check_permissions(req) is expected
 
-    assert "The 'django.contrib.auth' app is not installed" in caplog.text
+    # warned about once by the `django_simple_nav.W001` system check instead
+    assert "The 'django.contrib.auth' app is not installed" not in caplog.text
+
+
+def test_check_permissions_request_permissions_cached(req):
+    item = NavItem(title=..., url=..., permissions=["is_staff"])
+
+    req.user = baker.make(get_user_model(), is_staff=True)
+
+    assert item.check_permissions(req) is True
+    assert req._django_simple_nav_permissions.user is req.user
+    assert req._django_simple_nav_permissions.is_superuser is False
 
 
 def test_check_permissions_callable_anonymous(req):
@@ -493,3 +680,57 @@ def test_check_permissions_auth_permission_is_superuser(permissions, expected, r
     req.user = user
 
     assert item.check_permissions(req) == expected
+
+
+def test_stored_immutably():
+    item = NavItem(
+        title=...,
+        url="/",
+        permissions=["is_staff"],
+        extra_context={"tags": ["a", "b"], "meta": {"icon": "home"}},
+    )
+
+    assert item.permissions == ("is_staff",)
+    assert item.extra_context == {"tags": ("a", "b"), "meta": {"icon": "home"}}
+
+    with pytest.raises(TypeError):
+        item.extra_context["tags"] = ()  # type: ignore[index]
+    with pytest.raises(TypeError):
+        item.extra_context["meta"]["icon"] = "away"  # type: ignore[index]
+
+
+def test_hashable():
+    def make_item():
+        return NavItem(
+            title="Home",
+            url="/",
+            permissions=["is_staff"],
+            extra_context={"tags": ["a"]},
+        )
+
+    item = make_item()
+
+    assert hash(item) == hash(make_item())
+    assert {item: "home"}[make_item()] == "home"
+    assert len({item, make_item(), NavItem(title="Other", url="/")}) == 2
+
+
+def test_hash_memoized_but_not_pickled():
+    item = NavItem(title="Home", url="/", extra_context={"foo": "bar"})
+    hash(item)
+
+    assert item.__dict__["_hash"] == hash(item)
+
+    unpickled = pickle.loads(pickle.dumps(item))  # noqa: S301
+    assert unpickled == item
+    assert "_hash" not in unpickled.__dict__
+    assert hash(unpickled) == hash(item)
+    assert copy.deepcopy(item) == item
+
+
+def test_extra_context_rendered(req):
+    item = NavItem(title=..., url="/", extra_context={"foo": "bar"})
+
+    context = item.get_context_data(req)
+
+    assert context["foo"] == "bar"
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.models import update_last_login
+from django.core.cache import caches
+from django.http import HttpRequest
+from django.test import override_settings
+from model_bakery import baker
+
+from django_simple_nav._permissions import PERMISSION_CACHE_PREFIX
+from django_simple_nav._permissions import get_cached_permissions
+from django_simple_nav._permissions import get_permission_version
+from django_simple_nav.nav import Nav
+from django_simple_nav.nav import NavItem
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def permission_cache():
+    with override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+            "nav": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+        DJANGO_SIMPLE_NAV={"PERMISSION_CACHE": "nav"},
+    ):
+        yield caches["nav"]
+        caches["nav"].clear()
+
+
+@pytest.fixture
+def dummy_perm():
+    return baker.make(
+        "auth.Permission",
+        codename="dummy_perm",
+        name="Dummy Permission",
+        content_type=baker.make("contenttypes.ContentType", app_label="tests"),
+    )
+
+
+def make_request(user):
+    request = HttpRequest()
+    request.META = {"HTTP_HOST": "test"}
+    # fetch a fresh instance, as Django would for each request, so that the
+    # permissions cached on the user object itself aren't reused
+    request.user = get_user_model().objects.get(pk=user.pk)
+    return request
+
+
+@pytest.fixture
+def nav():
+    return Nav(
+        items=[
+            NavItem(title="Public", url="/"),
+            NavItem(title="Dummy", url="/dummy/", permissions=["tests.dummy_perm"]),
+        ]
+    )
+
+
+def test_cached_across_requests(permission_cache, dummy_perm, nav):
+    user = baker.make(get_user_model())
+    user.user_permissions.add(dummy_perm)
+
+    user_model = get_user_model()
+    with patch.object(
+        user_model, "has_perm", autospec=True, side_effect=user_model.has_perm
+    ) as has_perm:
+        first = nav.get_items(make_request(user))
+        second = nav.get_items(make_request(user))
+
+    assert [item.title for item in first] == ["Public", "Dummy"]
+    assert first == second
+    assert has_perm.call_count == 1
+
+
+def test_invalidated_by_adding_permission(permission_cache, dummy_perm, nav):
+    user = baker.make(get_user_model())
+
+    assert len(nav.get_items(make_request(user))) == 1
+
+    user.user_permissions.add(dummy_perm)
+
+    assert len(nav.get_items(make_request(user))) == 2
+
+
+def test_invalidated_by_saving_user(permission_cache, dummy_perm, nav):
+    user = baker.make(get_user_model())
+    user.user_permissions.add(dummy_perm)
+
+    assert len(nav.get_items(make_request(user))) == 2
+
+    user.is_active = False
+    user.save()
+
+    # inactive users have no permissions
+    assert len(nav.get_items(make_request(user))) == 1
+
+
+def test_invalidated_by_group_permissions(permission_cache, dummy_perm, nav):
+    group = baker.make("auth.Group")
+    user = baker.make(get_user_model())
+    user.groups.add(group)
+
+    assert len(nav.get_items(make_request(user))) == 1
+
+    group.permissions.add(dummy_perm)
+
+    assert len(nav.get_items(make_request(user))) == 2
+
+
+def count_has_perm(nav, *users):
+    user_model = get_user_model()
+    with patch.object(
+        user_model, "has_perm", autospec=True, side_effect=user_model.has_perm
+    ) as has_perm:
+        for user in users:
+            nav.get_items(make_request(user))
+    return has_perm.call_count
+
+
+def test_saving_user_only_invalidates_that_user(permission_cache, dummy_perm, nav):
+    user, other = baker.make(get_user_model(), _quantity=2)
+    count_has_perm(nav, user, other)
+
+    user.is_superuser = False
+    user.save()
+
+    assert count_has_perm(nav, user, other) == 1
+
+
+def test_login_does_not_invalidate(permission_cache, dummy_perm, nav):
+    user = baker.make(get_user_model())
+    count_has_perm(nav, user)
+
+    update_last_login(None, user)
+
+    assert count_has_perm(nav, user) == 0
+
+
+def test_invalidated_by_adding_user_to_group(permission_cache, dummy_perm, nav):
+    group = baker.make("auth.Group")
+    group.permissions.add(dummy_perm)
+    user = baker.make(get_user_model())
+
+    assert len(nav.get_items(make_request(user))) == 1
+
+    group.user_set.add(user)
+
+    assert len(nav.get_items(make_request(user))) == 2
+
+
+def test_evicted_version_not_reused(permission_cache, dummy_perm, nav):
+    user = baker.make(get_user_model())
+    version = get_permission_version(permission_cache, user.pk)
+
+    permission_cache.delete(f"{PERMISSION_CACHE_PREFIX}:version")
+
+    assert get_permission_version(permission_cache, user.pk) != version
+
+
+def test_not_configured(req):
+    req.user = baker.make(get_user_model())
+
+    assert get_cached_permissions(req, req.user, ["tests.dummy_perm"], "") is None
+
+
+def test_anonymous_not_cached(permission_cache, req):
+    req.user = AnonymousUser()
+
+    assert get_cached_permissions(req, req.user, ["tests.dummy_perm"], "") is None
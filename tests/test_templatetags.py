@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+from unittest.mock import patch
+
 import pytest
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.template import Context
 from django.template import Template
 from django.template import TemplateSyntaxError
+from django.urls import get_urlconf
+from django.urls import set_urlconf
 from model_bakery import baker
 
 from django_simple_nav.nav import NavItem
@@ -271,3 +275,274 @@ def test_templatetag_with_template_name_kwarg_variable(req):
     )
 
     assert "This is an alternate template." in rendered_template
+
+
+def test_templatetag_with_cache(req, locmem_cache):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' cache=60 %}"
+    )
+    req.user = AnonymousUser()
+
+    rendered_template = template.render(Context({"request": req}))
+
+    with patch("django_simple_nav.templatetags.django_simple_nav.import_string") as imp:
+        assert template.render(Context({"request": req})) == rendered_template
+        imp.assert_not_called()
+
+    assert count_anchors(rendered_template) == 7
+
+
+def test_templatetag_with_cache_and_template_name(req, locmem_cache):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' 'tests/alternate.html' cache=60 %}"
+        "{% django_simple_nav 'tests.navs.DummyNav' cache=60 %}"
+    )
+    req.user = AnonymousUser()
+
+    rendered_template = template.render(Context({"request": req}))
+
+    assert rendered_template.count("This is an alternate template.") == 1
+
+
+def test_templatetag_with_cache_vary_on(req, locmem_cache):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav new_nav cache=timeout vary_on=theme %}"
+    )
+    req.user = AnonymousUser()
+
+    class LightNav(DummyNav):
+        items = [NavItem(title="Light", url="/light/")]
+
+    class DarkNav(DummyNav):
+        items = [NavItem(title="Dark", url="/dark/")]
+
+    light = template.render(
+        Context(
+            {"request": req, "new_nav": LightNav(), "timeout": 60, "theme": "light"}
+        )
+    )
+    dark = template.render(
+        Context({"request": req, "new_nav": DarkNav(), "timeout": 60, "theme": "dark"})
+    )
+
+    assert "Light" in light
+    assert "Dark" in dark
+
+
+def test_templatetag_with_cache_varies_on_path_and_user(rf, locmem_cache):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.dynamic_nav' cache=60 %}"
+    )
+
+    req = rf.get("/")
+    req.user = AnonymousUser()
+    anonymous = template.render(Context({"request": req}))
+
+    req = rf.get("/")
+    req.user = baker.make(get_user_model())
+    authenticated = template.render(Context({"request": req}))
+
+    assert "Dashboard" not in anonymous
+    assert "Dashboard" in authenticated
+
+
+def test_templatetag_with_cache_varies_on_query_string(rf, locmem_cache):
+    class PageNav(DummyNav):
+        items = [NavItem(title="Page 2", url="/?page=2")]
+
+        def get_template(self, template_name=None):
+            return "{% for item in items %}{{ item.active }}{% endfor %}"
+
+    template = Template(
+        "{% load django_simple_nav %}{% django_simple_nav nav cache=60 %}"
+    )
+
+    req = rf.get("/", {"page": "2"})
+    req.user = AnonymousUser()
+    page_2 = template.render(Context({"request": req, "nav": PageNav()}))
+
+    req = rf.get("/", {"page": "3"})
+    req.user = AnonymousUser()
+    page_3 = template.render(Context({"request": req, "nav": PageNav()}))
+
+    assert page_2 == "True"
+    assert page_3 == "False"
+
+
+def test_templatetag_with_cache_varies_on_host(rf, locmem_cache):
+    class HostNav(DummyNav):
+        items = [NavItem(title="Home", url="https://example.com/")]
+
+        def get_template(self, template_name=None):
+            return "{% for item in items %}{{ item.active }}{% endfor %}"
+
+    template = Template(
+        "{% load django_simple_nav %}{% django_simple_nav nav cache=60 %}"
+    )
+
+    req = rf.get("/", secure=True, HTTP_HOST="example.com")
+    req.user = AnonymousUser()
+    example = template.render(Context({"request": req, "nav": HostNav()}))
+
+    req = rf.get("/", secure=True, HTTP_HOST="example.org")
+    req.user = AnonymousUser()
+    other_host = template.render(Context({"request": req, "nav": HostNav()}))
+
+    req = rf.get("/", HTTP_HOST="example.com")
+    req.user = AnonymousUser()
+    other_scheme = template.render(Context({"request": req, "nav": HostNav()}))
+
+    assert example == "True"
+    assert other_host == "False"
+    assert other_scheme == "False"
+
+
+def test_templatetag_with_cache_varies_on_urlconf(rf, locmem_cache):
+    class UrlconfNav(DummyNav):
+        def get_context_data(self, request):
+            return {**super().get_context_data(request), "urlconf": get_urlconf()}
+
+        def get_template(self, template_name=None):
+            return "{{ urlconf|default:'' }}"
+
+    template = Template(
+        "{% load django_simple_nav %}{% django_simple_nav nav cache=60 %}"
+    )
+
+    req = rf.get("/")
+    req.user = AnonymousUser()
+    default = template.render(Context({"request": req, "nav": UrlconfNav()}))
+
+    req = rf.get("/")
+    req.user = AnonymousUser()
+    req.urlconf = "tests.urls"
+    set_urlconf(req.urlconf)
+    try:
+        other = template.render(Context({"request": req, "nav": UrlconfNav()}))
+    finally:
+        set_urlconf(None)
+
+    assert default == ""
+    assert other == "tests.urls"
+
+
+def test_templatetag_with_vary_on_without_cache():
+    with pytest.raises(TemplateSyntaxError, match="vary_on"):
+        Template(
+            "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' vary_on=theme %}"
+        )
+
+
+def test_templatetag_with_invalid_cache(req, locmem_cache):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' cache='soon' %}"
+    )
+    req.user = AnonymousUser()
+
+    with pytest.raises(TemplateSyntaxError, match="Invalid 'cache' timeout"):
+        template.render(Context({"request": req}))
+
+
+@pytest.mark.parametrize("cache", ["", " cache=60"])
+def test_templatetag_with_render_override(req, cache, locmem_cache):
+    class OverrideNav(DummyNav):
+        def render(self, request, template_name=None):
+            return "overridden"
+
+    template = Template(
+        f"{{% load django_simple_nav %}}{{% django_simple_nav nav{cache} %}}"
+    )
+    req.user = AnonymousUser()
+
+    assert template.render(Context({"request": req, "nav": OverrideNav()})) == (
+        "overridden"
+    )
+
+
+def test_templatetag_with_max_depth(req):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' max_depth=1 %}"
+    )
+    req.user = AnonymousUser()
+
+    rendered_template = template.render(Context({"request": req}))
+
+    assert count_anchors(rendered_template) == 4
+
+
+def test_templatetag_with_max_depth_and_cache(req, locmem_cache):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' cache=60 max_depth=depth %}"
+    )
+    req.user = AnonymousUser()
+
+    shallow = template.render(Context({"request": req, "depth": 1}))
+    deep = template.render(Context({"request": req, "depth": 2}))
+
+    assert count_anchors(shallow) == 4
+    assert count_anchors(deep) == 7
+
+
+def test_templatetag_with_invalid_max_depth(req):
+    template = Template(
+        "{% load django_simple_nav %} {% django_simple_nav 'tests.navs.DummyNav' max_depth=0 %}"
+    )
+    req.user = AnonymousUser()
+
+    with pytest.raises(TemplateSyntaxError, match="Invalid 'max_depth'"):
+        template.render(Context({"request": req}))
+
+
+def test_batch_templatetag(req):
+    template = Template(
+        "{% load django_simple_nav %}"
+        "{% django_simple_navs main='tests.navs.DummyNav' alt=alt_nav as navs %}"
+        "{{ navs.alt }}|{{ navs.main }}"
+    )
+    req.user = AnonymousUser()
+
+    rendered_template = template.render(
+        Context(
+            {"request": req, "alt_nav": DummyNav(template_name="tests/alternate.html")}
+        )
+    )
+
+    alt, main = rendered_template.split("|")
+    assert "This is an alternate template." in alt
+    assert count_anchors(main) == 7
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        "",
+        "main='tests.navs.DummyNav'",
+        "'tests.navs.DummyNav' as navs",
+        "main='tests.navs.DummyNav' main='tests.navs.DummyNav' as navs",
+    ],
+)
+def test_batch_templatetag_invalid_arguments(arguments):
+    with pytest.raises(TemplateSyntaxError):
+        Template(
+            f"{{% load django_simple_nav %}}{{% django_simple_navs {arguments} %}}"
+        )
+
+
+def test_batch_templatetag_invalid_nav(req):
+    template = Template(
+        "{% load django_simple_nav %}"
+        "{% django_simple_navs main='path.to.DoesNotExist' as navs %}"
+    )
+
+    with pytest.raises(TemplateSyntaxError):
+        template.render(Context({"request": req}))
+
+
+def test_batch_templatetag_request_not_in_context():
+    template = Template(
+        "{% load django_simple_nav %}"
+        "{% django_simple_navs main='tests.navs.DummyNav' as navs %}"
+    )
+
+    with pytest.raises(TemplateSyntaxError):
+        template.render(Context({}))
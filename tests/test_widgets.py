@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+from unittest.mock import patch
+
 import pytest
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ImproperlyConfigured
 from django.test import override_settings
+from django.urls import get_urlconf
+from django.utils import translation
+from django.utils.translation import get_language
 
+from django_simple_nav._cache import make_cache_key
 from django_simple_nav.nav import Nav
 from django_simple_nav.nav import NavGroup
 from django_simple_nav.nav import NavItem
@@ -399,3 +405,195 @@ def test_navitemcontext_render_fails_gracefully_without_bundled_templates(
 
         with pytest.raises(TemplateDoesNotExist):
             str(item)
+
+
+# Fragment caching
+
+
+def item_key(item, cache_key):
+    return make_cache_key(
+        "item", item.get_content_hash(), cache_key, get_language(), get_urlconf()
+    )
+
+
+def test_navitem_cache_key_caches_rendered_html(req, locmem_cache):
+    item = NavGroup(
+        title="Account",
+        cache_key="account",
+        items=[NavItem(title="Profile", url="/profile/")],
+    )
+
+    rendered = item.render(req)
+
+    with patch("django_simple_nav.nav.render_to_string") as render_to_string:
+        assert item.render(req) == rendered
+        render_to_string.assert_not_called()
+
+    assert locmem_cache.get(item_key(item, "account")) == rendered
+
+
+def test_navitem_cache_key_spliced_into_nav(req, locmem_cache):
+    class TestNav(Nav):
+        template_name = "tests/self_render_nav.html"
+        items = [
+            NavItem(title="Live", url="/live/"),
+            NavItem(title="Cached", url="/cached/", cache_key="cached"),
+        ]
+
+    cached = TestNav.items[1]
+    locmem_cache.set(item_key(cached, "cached"), "<b>From cache</b>")
+
+    rendered = TestNav().render(req)
+
+    assert "Live" in rendered
+    assert "<b>From cache</b>" in rendered
+    assert "/cached/" not in rendered
+
+
+def test_navitem_cache_key_callable(rf, locmem_cache):
+    item = NavItem(
+        title="Home",
+        url="/",
+        cache_key=lambda request: f"home:{request.path}",
+        cache_timeout=lambda request: 60,
+    )
+
+    req = rf.get("/")
+
+    assert item.get_cache_key(req) == "home:/"
+    assert item.get_cache_timeout(req) == 60
+    assert item.render(req) == locmem_cache.get(item_key(item, "home:/"))
+
+
+def test_navitem_cache_key_none_not_cached(req, locmem_cache):
+    item = NavItem(title="Home", url="/", cache_key=lambda request: None)
+
+    item.render(req)
+
+    with patch("django_simple_nav.nav.render_to_string", return_value="") as render:
+        item.render(req)
+        render.assert_called_once()
+
+
+def test_navitem_cache_key_dynamic_group_get_active(rf, locmem_cache):
+    loads = []
+
+    class ProjectsGroup(NavGroup):
+        def get_items(self, request):
+            loads.append(request)
+            return [NavItem(title="Project", url="/projects/1/")]
+
+        def get_active(self, request):
+            return NavItem.get_active(self, request)
+
+    class TestNav(Nav):
+        template_name = "tests/self_render_nav.html"
+        items = [
+            ProjectsGroup(
+                title="Projects",
+                url="/projects/",
+                match="prefix",
+                cache_key="projects",
+            )
+        ]
+
+    first = TestNav().render(rf.get("/about/"))
+    loads.clear()
+
+    assert TestNav().render(rf.get("/about/")) == first
+    assert loads == []
+
+
+def test_navitem_cache_key_dynamic_group_not_loaded(rf, locmem_cache):
+    loads = []
+
+    class ProjectsGroup(NavGroup):
+        def get_items(self, request):
+            loads.append(request)
+            return [NavItem(title="Project", url="/projects/1/")]
+
+    class TestNav(Nav):
+        template_name = "tests/self_render_nav.html"
+        items = [
+            ProjectsGroup(title="Projects", url="/projects/", cache_key="projects")
+        ]
+
+    first = TestNav().render(rf.get("/about/"))
+    loads.clear()
+
+    for _ in range(2):
+        assert TestNav().render(rf.get("/about/")) == first
+    assert loads == []
+
+
+def test_navitem_cache_key_lazy_active(rf):
+    group = NavGroup(
+        title="Projects",
+        url="/projects/",
+        cache_key="projects",
+        items=[NavItem(title="Project", url="/projects/1/")],
+    )
+
+    context = group.get_context_data(rf.get("/projects/1/"))
+
+    assert context["active"]
+    assert context["active"] == True  # noqa: E712
+
+
+def test_navitem_cache_key_varies_on_language(rf, locmem_cache):
+    item = NavItem(title="Home", url="/", cache_key="home")
+
+    with translation.override("en"):
+        item.render(rf.get("/"))
+    with translation.override("de"):
+        item.render(rf.get("/"))
+        assert locmem_cache.get(item_key(item, "home")) is not None
+
+    assert len(locmem_cache._cache) == 2
+
+
+# Lazy children
+
+
+def test_children_built_lazily(req):
+    class TestNav(Nav):
+        template_name = "tests/self_render_nav.html"
+        items = [
+            NavGroup(
+                title="Group",
+                url="/group/",
+                items=[NavItem(title="Child", url="/child/")],
+            ),
+        ]
+
+    req.user = AnonymousUser()
+
+    context = TestNav().get_context_data(req)
+    children = context["items"][0]["items"]
+
+    assert not children.is_evaluated
+    assert len(children) == 1
+    assert children.is_evaluated
+    assert isinstance(children[0], NavItemContext)
+
+
+def test_children_built_once_per_render(req):
+    calls = []
+
+    class CountingNavItem(NavItem):
+        def get_context_data(self, request):
+            calls.append(self)
+            return super().get_context_data(request)
+
+    child = CountingNavItem(title="Child", url="/child/")
+
+    class TestNav(Nav):
+        template_name = "tests/self_render_nav.html"
+        items = [NavGroup(title="Group", url="/group/", items=[child])]
+
+    req.user = AnonymousUser()
+
+    rendered = TestNav().render(req)
+
+    assert "Child" in rendered
+    assert calls == [child]
@@ -11,5 +11,6 @@ def fake_view(request): ...
 
 urlpatterns = [
     path("fake-view/", fake_view, name="fake-view"),
+    path("fake-view/<int:pk>/", fake_view, name="fake-view-detail"),
     path("", home, name="home"),
 ]